@@ -0,0 +1,50 @@
+"""Import time of the investments module in a fresh interpreter
+
+Each run starts a new Python process, imports the module and reports how
+long the import took and whether NumPy was pulled in.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import [--module NAME] [--runs N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(elapsed, 'numpy' in sys.modules)\n"
+)
+
+
+def measure(module, runs):
+    """Return the per-run import times in seconds and whether NumPy was imported"""
+    times = []
+    numpy_loaded = False
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module)],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        times.append(float(output[0]))
+        numpy_loaded = numpy_loaded or output[1] == 'True'
+    return times, numpy_loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='investments', help='module to import (default: %(default)s)')
+    parser.add_argument('--runs', type=int, default=20, help='fresh interpreters to start')
+    args = parser.parse_args(argv)
+
+    times, numpy_loaded = measure(args.module, args.runs)
+    print(f"import {args.module}: median {statistics.median(times) * 1e3:.2f} ms, "
+          f"min {min(times) * 1e3:.2f} ms over {args.runs} runs; numpy imported: {numpy_loaded}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Speedup of process-parallel Monte Carlo simulation versus worker count
+
+Simulates the same seeded run with 1, 2, 4 and 8 worker processes (or the
+counts given), prints paths/second and speedup over a single worker, and
+checks that every run is bit-identical to the single-worker one. Speedup
+is bounded by the number of available cores.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_montecarlo [--paths N] [--years N] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from montecarlo import ReturnDistribution, simulate_paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paths', type=int, default=4_000_000, help='simulated paths')
+    parser.add_argument('--years', type=int, default=30, help='years per path')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='worker counts to time')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    distribution = ReturnDistribution('normal', 0.07, 0.15)
+    print(f"{os.cpu_count()} CPU(s) available")
+    print(f"{'workers':>8}{'seconds':>10}{'paths/s':>14}{'speedup':>9}{'identical':>11}")
+    reference = baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        balances = simulate_paths(1_000_000, 0.01, args.years, distribution, args.paths, args.seed, workers)
+        seconds = time.perf_counter() - start
+        if reference is None:
+            reference, baseline = balances, seconds
+        identical = all(np.array_equal(actual, expected) for actual, expected in zip(balances, reference))
+        print(f"{workers:>8}{seconds:>10.2f}{args.paths / seconds:>14,.0f}{baseline / seconds:>9.2f}"
+              f"{'yes' if identical else 'NO':>11}")
+
+
+if __name__ == '__main__':
+    main()
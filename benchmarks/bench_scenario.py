@@ -0,0 +1,66 @@
+"""Per-object memory and construction time of scenario records
+
+Compares the original dict-backed calculator with the slotted Scenario
+record and the slotted InvestmentCalculator that consumes it.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_scenario [--count N]
+"""
+import argparse
+import gc
+import timeit
+import tracemalloc
+
+from calculator import InvestmentCalculator, Scenario
+
+
+class LegacyCalculator:
+    """The original calculator layout, with parameters in a per-instance __dict__"""
+
+    def __init__(self, initial_value, fee_percentage, years, annual_return):
+        self.initial_value = initial_value
+        self.fee_percentage = fee_percentage
+        self.years = years
+        self.annual_return = annual_return
+
+
+FACTORIES = {
+    'legacy calculator (__dict__)': LegacyCalculator,
+    'Scenario record': Scenario,
+    'InvestmentCalculator (slots)': InvestmentCalculator,
+}
+
+
+def bytes_per_object(factory, count):
+    """Measure the average traced allocation per constructed object"""
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory(1_000_000.0, 0.01, 30, 0.07) for _ in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Subtract the list holding the objects
+    del objects
+    return (current - 8 * count) / count
+
+
+def construction_ns(factory, count):
+    """Measure the average construction time in nanoseconds"""
+    timer = timeit.Timer(lambda: factory(1_000_000.0, 0.01, 30, 0.07))
+    return min(timer.repeat(repeat=5, number=count)) / count * 1e9
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=200_000, help='objects per measurement')
+    args = parser.parse_args(argv)
+
+    print(f"{'type':<32}{'bytes/object':>14}{'ns/construct':>14}")
+    for name, factory in FACTORIES.items():
+        size = bytes_per_object(factory, args.count)
+        elapsed = construction_ns(factory, args.count)
+        print(f"{name:<32}{size:>14.1f}{elapsed:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Peak memory and time of shared-memory versus pickled Monte Carlo results
+
+Runs the same seeded parallel simulation with each transport in a fresh
+interpreter, so the peak resident set sizes do not mix, and prints wall
+time, the parent's peak RSS and the largest worker's peak RSS. With
+pickling each block is copied into a pickle, copied again into the
+parent's receive buffer and unpickled before it lands in the result
+arrays, while finished blocks queue up in the parent; with shared memory
+the workers write the result arrays in place and the parent reads them
+without copying.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_shared_memory [--paths N] [--years N] [--workers N]
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from montecarlo import TRANSPORT_SHARED_MEMORY, TRANSPORTS, ReturnDistribution, shared_paths, simulate_paths
+
+
+def run_transport(transport, paths, years, workers):
+    """Simulate once with transport and return timings and peak RSS in MiB"""
+    distribution = ReturnDistribution('normal', 0.07, 0.15)
+    start = time.perf_counter()
+    if transport == TRANSPORT_SHARED_MEMORY:
+        with shared_paths(1_000_000, 0.01, years, distribution, paths, 0, workers) as (no_fees, with_fees):
+            total = float(no_fees.sum() - with_fees.sum())
+    else:
+        no_fees, with_fees = simulate_paths(1_000_000, 0.01, years, distribution, paths, 0, workers)
+        total = float(no_fees.sum() - with_fees.sum())
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    return {
+        'transport': transport,
+        'seconds': seconds,
+        'parent_peak_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'worker_peak_mib': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        'total_fee_cost': total,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paths', type=int, default=20_000_000, help='simulated paths')
+    parser.add_argument('--years', type=int, default=30, help='years per path')
+    parser.add_argument('--workers', type=int, default=2, help='worker processes')
+    parser.add_argument('--transport', choices=TRANSPORTS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.transport:
+        print(json.dumps(run_transport(args.transport, args.paths, args.years, args.workers)))
+        return
+
+    result_mib = 2 * args.paths * 8 / 2 ** 20
+    print(f"{args.paths:,} paths x {args.years} years on {args.workers} workers; "
+          f"result arrays are {result_mib:,.0f} MiB")
+    print(f"{'transport':<15}{'seconds':>9}{'parent peak MiB':>17}{'worker peak MiB':>17}")
+    for transport in TRANSPORTS:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_shared_memory', '--paths', str(args.paths),
+             '--years', str(args.years), '--workers', str(args.workers), '--transport', transport],
+            check=True, capture_output=True, text=True,
+        )
+        report = json.loads(output.stdout)
+        print(f"{transport:<15}{report['seconds']:>9.2f}{report['parent_peak_mib']:>17,.0f}"
+              f"{report['worker_peak_mib']:>17,.0f}")
+
+
+if __name__ == '__main__':
+    main()
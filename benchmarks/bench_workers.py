@@ -0,0 +1,57 @@
+"""Throughput of sharded CSV scoring at several worker counts
+
+Generates a synthetic client book, scores it serially with score_csv as
+the baseline and then with pools of 1, 2, 4 and 8 worker processes (or the
+counts given), and prints rows/second and speedup over the serial run. The
+1-worker row shows what sharding itself costs; speedup is bounded by the
+number of available cores.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_workers [--rows N] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from scoring import INPUT_COLUMNS, score_csv, score_csv_parallel
+
+
+def write_book(path, rows, seed=0):
+    """Write a synthetic CSV of accounts"""
+    rng = np.random.default_rng(seed)
+    data = np.column_stack([
+        np.round(rng.uniform(10_000, 5_000_000, rows), 2),
+        rng.choice([0.0025, 0.005, 0.01, 0.015], rows),
+        np.round(rng.uniform(-0.02, 0.10, rows), 4),
+        rng.integers(1, 61, rows),
+    ])
+    np.savetxt(path, data, delimiter=',', fmt=['%.2f', '%g', '%.4f', '%d'],
+               header=','.join(INPUT_COLUMNS), comments='')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000, help='rows in the synthetic book')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='worker counts to time')
+    args = parser.parse_args(argv)
+
+    print(f"{os.cpu_count()} CPU(s) available")
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_path = os.path.join(work_dir, 'book.csv')
+        output_path = os.path.join(work_dir, 'scored.csv')
+        write_book(input_path, args.rows)
+        with open(input_path, newline='') as input_file, open(output_path, 'w', newline='') as output_file:
+            baseline = score_csv(input_file, output_file)
+        print(f"{'workers':>8}{'seconds':>10}{'rows/s':>14}{'speedup':>9}")
+        print(f"{'serial':>8}{baseline.seconds:>10.2f}{baseline.rows_per_second:>14,.0f}{1:>9.2f}")
+        for workers in args.workers:
+            summary = score_csv_parallel(input_path, output_path, workers)
+            print(f"{workers:>8}{summary.seconds:>10.2f}{summary.rows_per_second:>14,.0f}"
+                  f"{baseline.seconds / summary.seconds:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Differential accuracy-versus-speed check of the fast engines
+
+Samples random parameter sets (plus the edge cases exercised by the unit
+tests: zero years, negative returns, basis-point fees, zero return and
+zero fee), evaluates them with the reference year-by-year loop and with
+every fast engine, and reports the maximum absolute and relative error of
+each engine alongside its throughput. Exits with status 1 if any engine's
+relative error on the future value with fees exceeds --tolerance.
+
+The reference is the loop from InvestmentCalculator's 'loop' engine,
+vectorized across samples; it performs the same floating-point operations
+in the same order, and a subset is checked against the scalar loop itself.
+The reference fee gap is computed by subtraction and so loses relative
+precision for tiny fees (where the closed form is the more accurate of
+the two), so fee errors are reported relative to the fee-free balance.
+
+Run from the repository root:
+
+    python -m benchmarks.differential [--samples 1000000]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from calculator import compute_closed_form, compute_loop
+from vectorized import evaluate_batch, fee_ledger, trajectory_matrix
+
+EDGE_CASES = (
+    # initial_value, fee_percentage, years, annual_return
+    (1_000_000, 0.01, 0, 0.05),
+    (1_000_000, 0.01, 5, -0.05),
+    (1_000_000, 0.0001, 20, 0.05),
+    (1_000_000, 0.01, 10, 0.0),
+    (1_000_000, 0.0, 10, 0.05),
+    (1_000_000, 0.05, 10, 0.05),
+    (2_000_000, 0.01, 100, 0.30),
+)
+
+
+def sample_parameters(samples, seed=0):
+    """Return initial_value, fee_percentage, years, annual_return arrays including the edge cases"""
+    rng = np.random.default_rng(seed)
+    count = max(samples - len(EDGE_CASES), 0)
+    initial_value = 10 ** rng.uniform(3, 8, count)
+    fee_percentage = np.where(rng.random(count) < 0.1, 10 ** rng.uniform(-6, -3, count), rng.uniform(0, 0.03, count))
+    years = rng.integers(0, 101, count).astype(np.float64)
+    annual_return = rng.uniform(-0.5, 0.3, count)
+    edges = np.array(EDGE_CASES, dtype=np.float64).T
+    return tuple(np.concatenate([edge, column]) for edge, column in
+                 zip(edges, (initial_value, fee_percentage, years, annual_return)))
+
+
+def reference_loop(initial_value, fee_percentage, years, annual_return):
+    """The 'loop' engine across all samples at once: (no fees, with fees, fees)"""
+    no_fees = initial_value * (1 + annual_return) ** years
+    with_fees = initial_value.copy()
+    growth = 1 + annual_return - fee_percentage
+    for year in range(int(years.max()) if years.size else 0):
+        active = year < years
+        with_fees[active] *= growth[active]
+    return no_fees, with_fees, no_fees - with_fees
+
+
+def engine_scalar_closed_form(initial_value, fee_percentage, years, annual_return):
+    """InvestmentCalculator's closed-form engine, one scenario at a time"""
+    rows = [compute_closed_form(*row) for row in zip(
+        initial_value.tolist(), fee_percentage.tolist(), years.tolist(), annual_return.tolist())]
+    _, with_fees, fees, _ = (np.array(column) for column in zip(*rows))
+    return with_fees, fees
+
+
+def engine_batch_closed_form(initial_value, fee_percentage, years, annual_return):
+    """vectorized.evaluate_batch"""
+    result = evaluate_batch(initial_value, fee_percentage, years, annual_return)
+    return result.future_value_with_fees, result.total_fees_paid
+
+
+def engine_fee_ledger(initial_value, fee_percentage, years, annual_return):
+    """vectorized.fee_ledger"""
+    ledger = fee_ledger(initial_value, fee_percentage, years, annual_return)
+    return ledger.portfolio_value_with_fees, ledger.total_advisor_cost
+
+
+def engine_cumprod(initial_value, fee_percentage, years, annual_return, chunk=100_000):
+    """vectorized.trajectory_matrix, reading each scenario's own horizon"""
+    with_fees = np.empty_like(initial_value)
+    fees = np.empty_like(initial_value)
+    horizon = years.astype(np.intp)
+    for start in range(0, initial_value.size, chunk):
+        rows = slice(start, start + chunk)
+        no_fee_paths, fee_paths = trajectory_matrix(
+            initial_value[rows], fee_percentage[rows], annual_return[rows], int(horizon[rows].max()))
+        index = np.arange(no_fee_paths.shape[0])
+        with_fees[rows] = fee_paths[index, horizon[rows]]
+        fees[rows] = no_fee_paths[index, horizon[rows]] - with_fees[rows]
+    return with_fees, fees
+
+
+ENGINES = {
+    'scalar closed_form': engine_scalar_closed_form,
+    'batch closed_form': engine_batch_closed_form,
+    'fee_ledger': engine_fee_ledger,
+    'cumprod': engine_cumprod,
+}
+
+
+def errors(actual, expected, scale=None):
+    """Return (max absolute error, max error relative to scale, by default the expected value)"""
+    absolute = np.abs(actual - expected)
+    scale = expected if scale is None else scale
+    relative = absolute / np.maximum(np.abs(scale), np.finfo(np.float64).tiny)
+    # A zero reference matched exactly is no error at all
+    relative[absolute == 0] = 0
+    return float(absolute.max()), float(relative.max())
+
+
+def run(samples, scalar_samples, seed=0):
+    """Compare every engine to the reference and return one report per engine"""
+    parameters = sample_parameters(samples, seed)
+    start = time.perf_counter()
+    reference_no_fees, reference_with_fees, reference_fees = reference_loop(*parameters)
+    reference_seconds = time.perf_counter() - start
+
+    # The vectorized reference must reproduce the scalar loop bit for bit
+    for row in range(min(scalar_samples, samples)):
+        initial_value, fee_percentage, years, annual_return = (float(column[row]) for column in parameters)
+        scalar = compute_loop(initial_value, fee_percentage, int(years), annual_return)
+        if scalar.future_value_with_fees != reference_with_fees[row]:
+            raise AssertionError(f"Vectorized reference differs from the scalar loop at sample {row}")
+
+    reports = [{'engine': 'reference loop (vectorized)', 'samples': samples,
+                'scenarios_per_second': samples / reference_seconds}]
+    for name, engine in ENGINES.items():
+        count = scalar_samples if name.startswith('scalar') else samples
+        subset = tuple(column[:count] for column in parameters)
+        start = time.perf_counter()
+        with_fees, fees = engine(*subset)
+        seconds = time.perf_counter() - start
+        value_abs, value_rel = errors(with_fees, reference_with_fees[:count])
+        # The reference gap is itself only accurate to rounding of the balances it subtracts
+        fees_abs, fees_rel = errors(fees, reference_fees[:count], reference_no_fees[:count])
+        reports.append({
+            'engine': name, 'samples': count, 'scenarios_per_second': count / seconds,
+            'value_max_abs_error': value_abs, 'value_max_rel_error': value_rel,
+            'fees_max_abs_error': fees_abs, 'fees_max_rel_error': fees_rel,
+        })
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=1_000_000, help='random parameter sets')
+    parser.add_argument('--scalar-samples', type=int, default=100_000,
+                        help='samples for the one-at-a-time engines and the scalar reference check')
+    parser.add_argument('--tolerance', type=float, default=1e-9,
+                        help='maximum relative error allowed on the future value with fees')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the reports here')
+    args = parser.parse_args(argv)
+
+    reports = run(args.samples, args.scalar_samples, args.seed)
+    print(f"{'engine':<30}{'samples':>10}{'scenarios/s':>14}{'value abs':>12}{'value rel':>12}"
+          f"{'fees abs':>12}{'fees rel':>12}")
+    failed = False
+    for report in reports:
+        line = f"{report['engine']:<30}{report['samples']:>10,}{report['scenarios_per_second']:>14,.0f}"
+        if 'value_max_rel_error' in report:
+            line += (f"{report['value_max_abs_error']:>12.3g}{report['value_max_rel_error']:>12.3g}"
+                     f"{report['fees_max_abs_error']:>12.3g}{report['fees_max_rel_error']:>12.3g}")
+            failed = failed or report['value_max_rel_error'] > args.tolerance
+        print(line)
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(reports, output_file, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+"""Closed-loop load test of the HTTP calculation service
+
+Starts the service in a subprocess (unless --port points at a running one),
+keeps --concurrency keep-alive connections busy with POST /calculate for
+--duration seconds at each requested concurrency, and prints throughput
+with p50/p99 latency.
+
+Run from the repository root:
+
+    python -m benchmarks.loadtest [--concurrency 16 64 256] [--duration 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_service(window_ms):
+    """Start the service on a free port and return (process, port)"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'investments.py'), 'serve', '--port', '0', '--window-ms', str(window_ms)],
+        stderr=subprocess.PIPE, text=True,
+    )
+    line = process.stderr.readline()
+    return process, int(line.rsplit(':', 1)[1])
+
+
+def request_bytes(rng):
+    """Encode a POST /calculate request for a random scenario"""
+    body = json.dumps({
+        'initialValue': rng.choice([250_000, 1_000_000, 2_000_000]),
+        'feePercentage': rng.choice([0.0025, 0.01]),
+        'annualReturn': rng.choice([0.05, 0.07]),
+        'years': rng.randint(1, 40),
+    }).encode()
+    head = f"POST /calculate HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n"
+    return head.encode() + body
+
+
+async def client(port, deadline, latencies, seed):
+    """Issue requests back to back on one connection until the deadline"""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request_bytes(rng))
+            await writer.drain()
+            await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_level(port, concurrency, duration):
+    """Run one concurrency level and return the latencies in seconds"""
+    latencies = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, deadline, latencies, seed) for seed in range(concurrency)))
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, help='use an already running service on this port')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[16, 64, 256], help='open connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per concurrency level')
+    parser.add_argument('--window-ms', type=float, default=2.0, help='micro-batching window for a started service')
+    args = parser.parse_args(argv)
+
+    process = None
+    port = args.port
+    if port is None:
+        process, port = start_service(args.window_ms)
+    try:
+        print(f"{'conns':>6}{'requests':>10}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+        for concurrency in args.concurrency:
+            latencies = asyncio.run(run_level(port, concurrency, args.duration))
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(f"{concurrency:>6}{len(latencies):>10}{len(latencies) / args.duration:>10,.0f}"
+                  f"{quantiles[49] * 1e3:>9.2f}{quantiles[98] * 1e3:>9.2f}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
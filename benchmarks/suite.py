@@ -0,0 +1,153 @@
+"""Speed benchmarks for the calculator across horizons, batch sizes and engines
+
+Writes machine-readable results as JSON and, given a stored baseline,
+flags every case that became slower than the baseline by more than the
+threshold (exit status 1 when any regression is found).
+
+Run from the repository root:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline baseline.json --threshold 0.10
+    python -m benchmarks.suite --quick      # small batches only
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from calculator import ENGINES, InvestmentCalculator
+from vectorized import evaluate_batch, evaluate_horizons, fee_ledger
+
+HORIZONS = (1, 10, 30, 60, 100)
+BATCH_SIZES = (1, 10, 1_000, 100_000, 1_000_000, 10_000_000)
+QUICK_BATCH_SIZES = (1, 10, 1_000, 100_000)
+
+
+def measure(function, min_time=0.2, repeats=3):
+    """Return the best seconds per call of function() over several timed rounds"""
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeats:
+            break
+        calls *= 2 if elapsed == 0 else max(2, int(min_time / repeats / elapsed))
+    best = elapsed / calls
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def scenario_arrays(size, years, seed=0):
+    """Random account parameters for a batch of the given size"""
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(10_000, 5_000_000, size),
+        rng.choice([0.0025, 0.005, 0.01, 0.015], size),
+        np.full(size, float(years)),
+        rng.uniform(-0.02, 0.10, size),
+    )
+
+
+def scalar_cases():
+    """One InvestmentCalculator.compute() per call, for each engine and horizon"""
+    for engine in ENGINES:
+        for years in HORIZONS:
+            def run(years=years, engine=engine):
+                InvestmentCalculator(1_000_000, 0.01, years, 0.07, engine).compute()
+            yield {'name': f'scalar/{engine}/years={years}', 'engine': engine, 'batch_size': 1,
+                   'years': years}, run
+
+
+def batch_cases(batch_sizes):
+    """Vectorized evaluate_batch and fee_ledger at each batch size (30-year horizon)"""
+    for size in batch_sizes:
+        arrays = scenario_arrays(size, 30)
+        yield {'name': f'batch/closed_form/size={size}', 'engine': 'closed_form', 'batch_size': size,
+               'years': 30}, lambda arrays=arrays: evaluate_batch(*arrays)
+        yield {'name': f'fee_ledger/closed_form/size={size}', 'engine': 'closed_form', 'batch_size': size,
+               'years': 30}, lambda arrays=arrays: fee_ledger(*arrays)
+
+
+def horizon_cases(batch_sizes):
+    """Shared cumulative-product evaluation of every horizon at once"""
+    for size in batch_sizes:
+        if size > 1_000_000:
+            # The scenarios x years matrices would need gigabytes; chunking is covered at smaller sizes
+            continue
+        initial_value, fee_percentage, _, annual_return = scenario_arrays(size, 0)
+
+        def run(initial_value=initial_value, fee_percentage=fee_percentage, annual_return=annual_return):
+            evaluate_horizons(initial_value, fee_percentage, annual_return, HORIZONS, max_bytes=256 * 1024 * 1024)
+        yield {'name': f'horizons/cumprod/size={size}', 'engine': 'cumprod', 'batch_size': size,
+               'years': max(HORIZONS)}, run
+
+
+def run_suite(batch_sizes, min_time):
+    """Run every case and return the list of result records"""
+    results = []
+    # Chain lazily so only one case's input arrays are alive at a time
+    cases = itertools.chain(scalar_cases(), batch_cases(batch_sizes), horizon_cases(batch_sizes))
+    for case, function in cases:
+        seconds = measure(function, min_time)
+        case.update(seconds_per_call=seconds, scenarios_per_second=case['batch_size'] / seconds)
+        results.append(case)
+        print(f"{case['name']:<40}{seconds * 1e6:>14.2f} us/call{case['scenarios_per_second']:>16,.0f} scenarios/s",
+              file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return (name, baseline seconds, current seconds, slowdown) for every regressed case"""
+    previous = {case['name']: case['seconds_per_call'] for case in baseline['results']}
+    regressions = []
+    for case in results:
+        before = previous.get(case['name'])
+        if before and case['seconds_per_call'] > before * (1 + threshold):
+            regressions.append((case['name'], before, case['seconds_per_call'], case['seconds_per_call'] / before - 1))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='allowed slowdown as a fraction before flagging (default: %(default)s)')
+    parser.add_argument('--quick', action='store_true', help='skip batches above 100k scenarios')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds to spend per case')
+    args = parser.parse_args(argv)
+
+    results = run_suite(QUICK_BATCH_SIZES if args.quick else BATCH_SIZES, args.min_time)
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        for name, before, after, slowdown in regressions:
+            print(f"REGRESSION {name}: {before * 1e6:.2f} -> {after * 1e6:.2f} us/call (+{slowdown:.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
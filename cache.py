@@ -0,0 +1,100 @@
+"""Bounded in-memory result cache with hit-rate statistics"""
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+
+POLICY_LRU = 'lru'
+POLICY_FIFO = 'fifo'
+POLICIES = (POLICY_LRU, POLICY_FIFO)
+
+_MISSING = object()
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'size', 'capacity', 'memory_bytes'])
+
+
+def _footprint(obj):
+    """Approximate the memory held by a key or value, including tuple and dict members"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, tuple):
+        size += sum(sys.getsizeof(item) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in obj.items())
+    return size
+
+
+class ResultCache:
+    """Mapping of keys to computed results with bounded capacity
+
+    With the 'lru' policy a hit refreshes the entry so the least recently
+    used one is evicted first; with 'fifo' entries are evicted in insertion
+    order regardless of use.
+    """
+
+    def __init__(self, capacity=1024, policy=POLICY_LRU):
+        if capacity < 1:
+            raise ValueError(f"Cache capacity must be positive, got {capacity}")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy!r}; expected one of {POLICIES}")
+        self.capacity = capacity
+        self.policy = policy
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.memory_bytes = 0
+
+    def get(self, key, default=None):
+        """Return the cached result for key, counting a hit or a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            if self.policy == POLICY_LRU:
+                self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, result):
+        """Store a result, evicting entries beyond capacity"""
+        with self._lock:
+            if key in self._entries:
+                return
+            size = _footprint(key) + _footprint(result)
+            self._entries[key] = (result, size)
+            self.memory_bytes += size
+            while len(self._entries) > self.capacity:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.memory_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached result for key, calling compute() and storing it on a miss"""
+        result = self.get(key, _MISSING)
+        if result is _MISSING:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._lock:
+            return CacheStats(
+                self.hits, self.misses, self.evictions, len(self._entries), self.capacity, self.memory_bytes
+            )
+
+    def hit_rate(self):
+        """Return the fraction of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
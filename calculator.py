@@ -0,0 +1,249 @@
+import math
+import os
+from collections import namedtuple
+
+from cache import POLICY_LRU, ResultCache
+
+
+ENGINE_CLOSED_FORM = 'closed_form'
+ENGINE_LOOP = 'loop'
+ENGINES = (ENGINE_CLOSED_FORM, ENGINE_LOOP)
+
+Scenario = namedtuple('Scenario', ['initial_value', 'fee_percentage', 'years', 'annual_return'])
+Scenario.__doc__ = """Immutable, hashable parameter record consumed by InvestmentCalculator"""
+
+CalculationResult = namedtuple(
+    'CalculationResult',
+    ['future_value_no_fees', 'future_value_with_fees', 'total_fees_paid', 'opportunity_cost']
+)
+
+YearRecord = namedtuple(
+    'YearRecord',
+    ['year', 'balance_no_fees', 'balance_with_fees', 'fee_charged', 'cumulative_lost_growth']
+)
+
+
+def growth_factor(rate, years):
+    """Return (1 + rate) ** years, using log1p so tiny rates stay accurate"""
+    if rate <= -1:
+        # log1p is undefined here; fall back to the plain power
+        return (1 + rate) ** years
+    return math.exp(years * math.log1p(rate))
+
+
+def growth_gap(annual_return, fee_percentage, years):
+    """Return (1 + r) ** n - (1 + r - f) ** n without cancellation for small fees"""
+    if annual_return <= -1 or annual_return - fee_percentage <= -1:
+        return growth_factor(annual_return, years) - growth_factor(annual_return - fee_percentage, years)
+    net_return = annual_return - fee_percentage
+    log_with_fees = math.log1p(net_return)
+    # log(1 + r) - log(1 + r - f), written so that a tiny fee is not lost in r - f
+    log_spread = math.log1p(fee_percentage / (1 + net_return))
+    return math.exp(years * log_with_fees) * math.expm1(years * log_spread)
+
+
+def compute_closed_form(initial_value, fee_percentage, years, annual_return):
+    """Evaluate every figure in O(1)"""
+    no_fees = initial_value * growth_factor(annual_return, years)
+    with_fees = initial_value * growth_factor(annual_return - fee_percentage, years)
+    fees = initial_value * growth_gap(annual_return, fee_percentage, years)
+    return CalculationResult(no_fees, with_fees, fees, fees)
+
+
+def compute_loop(initial_value, fee_percentage, years, annual_return):
+    """Reference implementation compounding the net return once per year"""
+    no_fees = initial_value * (1 + annual_return) ** years
+    with_fees = initial_value
+    for year in range(years):
+        with_fees *= (1 + annual_return - fee_percentage)
+    return CalculationResult(no_fees, with_fees, no_fees - with_fees, no_fees - with_fees)
+
+
+def evaluate(scenario, engine=ENGINE_CLOSED_FORM):
+    """Calculate every figure for a Scenario with the given engine"""
+    if engine == ENGINE_LOOP:
+        return compute_loop(*scenario)
+    return compute_closed_form(*scenario)
+
+
+def quantize_scenario(scenario):
+    """Round money to cents and rates to basis points"""
+    return Scenario(
+        round(scenario.initial_value, 2),
+        round(scenario.fee_percentage, 4),
+        scenario.years,
+        round(scenario.annual_return, 4),
+    )
+
+
+# Process-wide result cache; None while disabled
+_result_cache = None
+_quantize_cache_inputs = False
+
+
+def enable_result_cache(capacity=1024, policy=POLICY_LRU, quantize=False):
+    """Serve InvestmentCalculator results from a shared bounded cache
+
+    With quantize=True inputs are rounded to cents and basis points before
+    lookup and evaluation, so near-identical requests share one entry.
+    Returns the cache so callers can inspect its statistics.
+    """
+    global _result_cache, _quantize_cache_inputs
+    _result_cache = ResultCache(capacity, policy)
+    _quantize_cache_inputs = quantize
+    return _result_cache
+
+
+def disable_result_cache():
+    """Stop using the shared result cache and discard its contents"""
+    global _result_cache, _quantize_cache_inputs
+    _result_cache = None
+    _quantize_cache_inputs = False
+
+
+def get_result_cache():
+    """Return the shared result cache, or None when it is disabled"""
+    return _result_cache
+
+
+def _cached_evaluate(scenario, engine):
+    """Evaluate through the shared result cache"""
+    if _quantize_cache_inputs:
+        scenario = quantize_scenario(scenario)
+    return _result_cache.get_or_compute((scenario, engine), lambda: evaluate(scenario, engine))
+
+
+def _scenario_field(name):
+    """Expose one Scenario field as a read/write calculator attribute"""
+    slot = '_' + name
+
+    def get(self):
+        return getattr(self, slot)
+
+    def set(self, value):
+        setattr(self, slot, value)
+        self._scenario = None
+        self._result = None
+
+    return property(get, set, doc=f"Scenario {name}")
+
+
+class InvestmentCalculator:
+    """Helper class to encapsulate investment calculations
+
+    The default closed-form engine evaluates every figure in O(1) regardless
+    of the horizon. Pass engine='loop' to use the original year-by-year
+    compounding loop as a reference.
+
+    Parameters are held in slots and exposed together as an immutable
+    Scenario record, built on first use. All four figures come from a single
+    evaluation that is cached on the instance and discarded when a parameter
+    or the engine is reassigned. See enable_result_cache() for sharing
+    results between instances.
+    """
+
+    __slots__ = ('_initial_value', '_fee_percentage', '_years', '_annual_return', '_engine', '_scenario', '_result')
+
+    initial_value = _scenario_field('initial_value')
+    fee_percentage = _scenario_field('fee_percentage')
+    years = _scenario_field('years')
+    annual_return = _scenario_field('annual_return')
+
+    def __init__(self, initial_value, fee_percentage, years, annual_return, engine=ENGINE_CLOSED_FORM):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+        self._initial_value = initial_value
+        self._fee_percentage = fee_percentage
+        self._years = years
+        self._annual_return = annual_return
+        self._engine = engine
+        # Building the record costs as much as the rest of construction, so defer it
+        self._scenario = None
+        self._result = None
+
+    @classmethod
+    def from_scenario(cls, scenario, engine=ENGINE_CLOSED_FORM):
+        """Create a calculator for an existing Scenario record"""
+        calc = cls(*scenario, engine=engine)
+        calc._scenario = scenario
+        return calc
+
+    @property
+    def scenario(self):
+        """The parameters as a Scenario record"""
+        if self._scenario is None:
+            self._scenario = Scenario(self._initial_value, self._fee_percentage, self._years, self._annual_return)
+        return self._scenario
+
+    @scenario.setter
+    def scenario(self, scenario):
+        self._initial_value, self._fee_percentage, self._years, self._annual_return = scenario
+        self._scenario = scenario
+        self._result = None
+
+    @property
+    def engine(self):
+        """Name of the engine used by compute()"""
+        return self._engine
+
+    @engine.setter
+    def engine(self, engine):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+        self._engine = engine
+        self._result = None
+
+    def compute(self):
+        """Calculate all figures at once, reusing the cached result until a parameter or the engine changes"""
+        if self._result is None:
+            if _result_cache is None:
+                self._result = evaluate(self.scenario, self._engine)
+            else:
+                self._result = _cached_evaluate(self.scenario, self._engine)
+        return self._result
+
+    def future_value_no_fees(self):
+        """Calculate portfolio value without fees (just compounding growth)"""
+        return self.compute().future_value_no_fees
+
+    def future_value_with_fees(self):
+        """Calculate portfolio value with annual fees deducted"""
+        return self.compute().future_value_with_fees
+
+    def total_fees_paid(self):
+        """Calculate total fees paid"""
+        return self.compute().total_fees_paid
+
+    def opportunity_cost(self):
+        """Calculate opportunity cost (same as total fees paid)"""
+        return self.compute().opportunity_cost
+
+    def iter_trajectory(self):
+        """Yield a YearRecord for each year of the horizon, computed incrementally
+
+        fee_charged is the fee taken from the start-of-year balance and
+        cumulative_lost_growth is the gap between the two balances beyond the
+        fees charged so far, i.e. the growth those fees would have earned.
+        """
+        initial_value, fee_percentage, years, annual_return = self.scenario
+        growth = 1 + annual_return
+        balance_no_fees = initial_value
+        balance_with_fees = initial_value
+        fees_to_date = 0
+        for year in range(1, years + 1):
+            fee_charged = balance_with_fees * fee_percentage
+            balance_no_fees *= growth
+            balance_with_fees = balance_with_fees * growth - fee_charged
+            fees_to_date += fee_charged
+            lost_growth = balance_no_fees - balance_with_fees - fees_to_date
+            yield YearRecord(year, balance_no_fees, balance_with_fees, fee_charged, lost_growth)
+
+    def trajectory(self):
+        """Return the full year-by-year trajectory as a list"""
+        return list(self.iter_trajectory())
+
+
+if os.environ.get('CALCULATOR_PROFILE'):
+    # Opt-in hot-path profiling of this and the other target modules; see profiling.py
+    import profiling
+    profiling.enable_from_environment()
@@ -0,0 +1,195 @@
+"""Constant-memory streaming estimators of quantiles, moments and tail means
+
+Every estimator takes values in batches (NumPy arrays) and can be merged,
+so separately accumulated partial results, e.g. one per block of Monte
+Carlo paths, combine into the estimate for all of them.
+"""
+import math
+
+import numpy as np
+
+
+DEFAULT_COMPRESSION = 1000
+
+
+class RunningMoments:
+    """Count, mean and variance by Welford's update, merged with Chan's formula"""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # Sum of squared deviations from the mean
+        self.m2 = 0.0
+
+    def update(self, values):
+        """Add a batch of values"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size:
+            batch_mean = float(values.mean())
+            deviations = values - batch_mean
+            self._combine(values.size, batch_mean, float(np.dot(deviations, deviations)))
+
+    def merge(self, other):
+        """Add everything accumulated by another RunningMoments"""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    @property
+    def variance(self):
+        """Sample variance, NaN with fewer than two values"""
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        """Sample standard deviation"""
+        return math.sqrt(self.variance)
+
+
+class RunningCovariance:
+    """Means, variances and covariance of paired values, merged with Chan's formula"""
+
+    __slots__ = ('count', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'c_xy')
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        # Sum of products of deviations from the means
+        self.c_xy = 0.0
+
+    def update(self, x, y):
+        """Add a batch of (x, y) pairs"""
+        x = np.asarray(x, dtype=np.float64).ravel()
+        y = np.asarray(y, dtype=np.float64).ravel()
+        if x.size:
+            mean_x = float(x.mean())
+            mean_y = float(y.mean())
+            deviations_x = x - mean_x
+            deviations_y = y - mean_y
+            self._combine(x.size, mean_x, mean_y, float(np.dot(deviations_x, deviations_x)),
+                          float(np.dot(deviations_y, deviations_y)), float(np.dot(deviations_x, deviations_y)))
+
+    def merge(self, other):
+        """Add everything accumulated by another RunningCovariance"""
+        if other.count:
+            self._combine(other.count, other.mean_x, other.mean_y, other.m2_x, other.m2_y, other.c_xy)
+
+    def _combine(self, count, mean_x, mean_y, m2_x, m2_y, c_xy):
+        total = self.count + count
+        delta_x = mean_x - self.mean_x
+        delta_y = mean_y - self.mean_y
+        weight = self.count * count / total
+        self.mean_x += delta_x * count / total
+        self.mean_y += delta_y * count / total
+        self.m2_x += m2_x + delta_x * delta_x * weight
+        self.m2_y += m2_y + delta_y * delta_y * weight
+        self.c_xy += c_xy + delta_x * delta_y * weight
+        self.count = total
+
+    @property
+    def variance_x(self):
+        """Sample variance of x, NaN with fewer than two pairs"""
+        return self.m2_x / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def variance_y(self):
+        """Sample variance of y, NaN with fewer than two pairs"""
+        return self.m2_y / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def covariance(self):
+        """Sample covariance of x and y, NaN with fewer than two pairs"""
+        return self.c_xy / (self.count - 1) if self.count > 1 else math.nan
+
+
+class TDigest:
+    """Merging t-digest: approximate quantiles from a bounded set of weighted centroids
+
+    Each update sorts the new values together with the existing centroids
+    and re-clusters them so that no cluster spans more than one unit of the
+    arcsine scale function, which keeps clusters small in the tails and
+    bounds their number by about compression / 2. Quantiles are
+    interpolated between centroid centres and the exact minimum and
+    maximum.
+    """
+
+    __slots__ = ('compression', 'means', 'weights', 'count', 'min', 'max')
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        if compression < 1:
+            raise ValueError(f"Compression must be positive, got {compression}")
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        """Add a batch of values"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size:
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(values.size)]))
+
+    def merge(self, other):
+        """Add everything summarized by another TDigest"""
+        if other.count:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means = means[order]
+        weights = weights[order]
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        # Scale-function position of each item's midpoint; items in the same unit interval form a cluster
+        midpoints = (cumulative - weights / 2) / total
+        scale = np.floor(self.compression / (2 * math.pi) * np.arcsin(2 * midpoints - 1))
+        starts = np.flatnonzero(np.concatenate([[True], scale[1:] != scale[:-1]]))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+        self.count = int(round(total))
+
+    def quantile(self, q):
+        """Return the estimated q-quantile (q in [0, 1], scalar or array)"""
+        if not self.count:
+            raise ValueError("Cannot take a quantile of an empty digest")
+        centres = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate([[0.0], centres, [float(self.count)]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.asarray(q, dtype=np.float64) * self.count, positions, values)
+
+    def percentile(self, p):
+        """Return the estimated p-th percentile (p in [0, 100])"""
+        return self.quantile(np.asarray(p, dtype=np.float64) / 100)
+
+    def tail_mean(self, level, upper=False):
+        """Return the mean of the lowest (or, if upper, highest) fraction level of the values
+
+        This is the conditional value at risk (expected shortfall) of the
+        distribution at that level.
+        """
+        if not 0 < level <= 1:
+            raise ValueError(f"Tail level must be in (0, 1], got {level}")
+        if not self.count:
+            raise ValueError("Cannot take a tail mean of an empty digest")
+        means, weights = (self.means[::-1], self.weights[::-1]) if upper else (self.means, self.weights)
+        target = level * self.count
+        # Whole centroids inside the tail, then the part of the one straddling its edge
+        taken = np.minimum(weights, np.maximum(target - (np.cumsum(weights) - weights), 0))
+        return float(np.dot(taken, means) / taken.sum())
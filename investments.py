@@ -1,24 +1,234 @@
-# Initial parameters
-initial_value = 2_000_000  # Initial portfolio value ($2 million)
-fee_percentage = 0.01  # 1% annual fee
-years = 15  # Duration (15 years)
-annual_return = 0.05  # Annual return (5%)
-
-# Calculate the portfolio value without fees (just compounding growth)
-future_value_no_fees = initial_value * (1 + annual_return) ** years
-
-# Calculate the future value with fees (subtracting 1% annually)
-portfolio_value_with_fees = initial_value
-for year in range(years):
-    portfolio_value_with_fees *= (1 + annual_return - fee_percentage)
-
-# Calculate total fees paid
-total_fees_paid = future_value_no_fees - portfolio_value_with_fees
-
-# Calculate the opportunity cost (difference in future values)
-opportunity_cost = future_value_no_fees - portfolio_value_with_fees
-
-# Print results
-print(f"Total fees paid: ${total_fees_paid:,.2f}")
-print(f"Opportunity cost (lost investment): ${opportunity_cost:,.2f}")
-print(f"Future value without fees: ${future_value_no_fees:,.2f}")
+"""Command-line report of what advisory fees cost a portfolio
+
+Importing this module has no side effects; run it as a script or call
+main() with an argument list. Without a command it reports one scenario;
+the batch command scores a CSV of accounts, the stream command scores
+JSON Lines from stdin to stdout, the serve command runs the HTTP
+calculation service and the montecarlo command simulates random annual
+returns around --annual-return.
+"""
+import sys
+
+from calculator import ENGINE_CLOSED_FORM, ENGINES, InvestmentCalculator
+
+# Default parameters
+INITIAL_VALUE = 2_000_000  # Initial portfolio value ($2 million)
+FEE_PERCENTAGE = 0.01  # 1% annual fee
+YEARS = 15  # Duration (15 years)
+ANNUAL_RETURN = 0.05  # Annual return (5%)
+
+
+def build_parser():
+    """Build the command-line argument parser"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calculate the wealth impact of advisory fees.")
+    parser.add_argument('--initial-value', type=float, default=INITIAL_VALUE,
+                        help=f"initial portfolio value (default: {INITIAL_VALUE:,})")
+    parser.add_argument('--fee-percentage', type=float, default=FEE_PERCENTAGE,
+                        help=f"annual fee as a fraction (default: {FEE_PERCENTAGE})")
+    parser.add_argument('--years', type=int, default=YEARS,
+                        help=f"investment horizon in years (default: {YEARS})")
+    parser.add_argument('--annual-return', type=float, default=ANNUAL_RETURN,
+                        help=f"annual return as a fraction (default: {ANNUAL_RETURN})")
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINE_CLOSED_FORM,
+                        help="calculation engine (default: %(default)s)")
+
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    batch = commands.add_parser('batch', help="score a CSV of accounts in fixed-size chunks")
+    batch.add_argument('input', help="CSV with initial_value, fee_percentage, annual_return and years columns")
+    batch.add_argument('output', help="CSV to write, the input columns followed by the results")
+    batch.add_argument('--chunk-size', type=int, default=100_000, help="rows per chunk (default: %(default)s)")
+    batch.add_argument('--workers', type=int, default=1,
+                       help="worker processes; above 1 the file is sharded by byte range (default: %(default)s)")
+
+    stream = commands.add_parser('stream', help="score JSON Lines scenario objects from stdin to stdout")
+    stream.add_argument('--batch-size', type=int, default=4096,
+                        help="records evaluated together (default: %(default)s)")
+
+    serve = commands.add_parser('serve', help="run the HTTP calculation service")
+    serve.add_argument('--host', default='127.0.0.1', help="address to bind (default: %(default)s)")
+    serve.add_argument('--port', type=int, default=8080, help="port to bind (default: %(default)s)")
+    serve.add_argument('--window-ms', type=float, default=2.0,
+                       help="micro-batching window in milliseconds (default: %(default)s)")
+    serve.add_argument('--cache-size', type=int, default=0,
+                       help="LRU result cache entries; 0 disables the cache (default: %(default)s)")
+
+    montecarlo = commands.add_parser('montecarlo', help="simulate random annual returns around --annual-return")
+    montecarlo.add_argument('--paths', type=int, default=100_000,
+                            help="simulated paths (default: %(default)s)")
+    montecarlo.add_argument('--volatility', type=float, default=0.15,
+                            help="standard deviation of the annual return (default: %(default)s)")
+    montecarlo.add_argument('--distribution', choices=('normal', 'lognormal', 'student_t'), default='normal',
+                            help="annual return distribution (default: %(default)s)")
+    montecarlo.add_argument('--degrees-of-freedom', type=float, default=5,
+                            help="tail weight of the student_t distribution (default: %(default)s)")
+    montecarlo.add_argument('--seed', type=int, help="random seed for a reproducible run")
+    montecarlo.add_argument('--workers', type=int, default=1,
+                            help="worker processes; results do not depend on this (default: %(default)s)")
+    montecarlo.add_argument('--memory-budget', type=float,
+                            help="MiB each process may use for simulation working memory; implies --streaming")
+    # Each mode summarizes the paths its own way, so only one may be chosen
+    modes = montecarlo.add_mutually_exclusive_group()
+    modes.add_argument('--streaming', action='store_true',
+                       help="summarize with constant-memory estimators instead of keeping every path")
+    modes.add_argument('--expected-fees', action='store_true',
+                       help="estimate only the expected fee cost, using antithetic and control variates")
+    modes.add_argument('--compare-fees', type=float, nargs='+', metavar='FEE',
+                       help="compare these fee levels on the same simulated returns instead of --fee-percentage")
+    return parser
+
+
+def report(initial_value, fee_percentage, years, annual_return, engine=ENGINE_CLOSED_FORM):
+    """Print the fee report for one scenario"""
+    # Calculate every figure from a single evaluation
+    result = InvestmentCalculator(initial_value, fee_percentage, years, annual_return, engine).compute()
+
+    print(f"Total fees paid: ${result.total_fees_paid:,.2f}")
+    print(f"Opportunity cost (lost investment): ${result.opportunity_cost:,.2f}")
+    print(f"Future value without fees: ${result.future_value_no_fees:,.2f}")
+
+
+def run_batch(input_path, output_path, chunk_size, workers=1):
+    """Score a CSV file and report throughput on stderr"""
+    # NumPy is only needed here, so keep it off the single-scenario path
+    from scoring import score_csv, score_csv_parallel
+
+    if workers > 1:
+        summary = score_csv_parallel(input_path, output_path, workers, chunk_size)
+    else:
+        with open(input_path, newline='') as input_file, open(output_path, 'w', newline='') as output_file:
+            summary = score_csv(input_file, output_file, chunk_size)
+    print(f"Scored {summary.rows:,} rows in {summary.seconds:.2f}s "
+          f"({summary.rows_per_second:,.0f} rows/s)", file=sys.stderr)
+
+
+def run_stream(batch_size):
+    """Score JSON Lines from stdin to stdout and report throughput on stderr"""
+    from scoring import stream_jsonl
+
+    summary = stream_jsonl(sys.stdin, sys.stdout, batch_size)
+    print(f"Scored {summary.rows:,} records in {summary.seconds:.2f}s "
+          f"({summary.rows_per_second:,.0f} records/s)", file=sys.stderr)
+
+
+def run_serve(host, port, window_ms, cache_size=0):
+    """Run the HTTP calculation service until interrupted"""
+    import asyncio
+
+    from cache import ResultCache
+    from service import serve
+
+    cache = ResultCache(cache_size) if cache_size else None
+
+    async def run():
+        ready = asyncio.get_running_loop().create_future()
+        server = asyncio.create_task(serve(host, port, window=window_ms / 1000, cache=cache, ready=ready))
+        bound_host, bound_port = await ready
+        print(f"Listening on http://{bound_host}:{bound_port}", file=sys.stderr, flush=True)
+        await server
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def run_montecarlo(initial_value, fee_percentage, years, annual_return, paths, volatility,
+                   distribution='normal', degrees_of_freedom=5, seed=None, workers=1, streaming=False,
+                   memory_budget_mib=None):
+    """Print percentile bands of simulated terminal wealth and fee cost"""
+    import math
+    import time
+
+    from montecarlo import ReturnDistribution, peak_rss, simulate, simulate_streaming
+
+    start = time.perf_counter()
+    distribution = ReturnDistribution(distribution, annual_return, volatility, degrees_of_freedom)
+    if streaming or memory_budget_mib is not None:
+        memory_budget = None if memory_budget_mib is None else int(memory_budget_mib * 2 ** 20)
+        result = simulate_streaming(initial_value, fee_percentage, years, distribution, paths, seed, workers=workers,
+                                    memory_budget=memory_budget)
+    else:
+        result = simulate(initial_value, fee_percentage, years, distribution, paths, seed, workers=workers)
+    seconds = time.perf_counter() - start
+
+    print(f"{'Percentile':>10}{'Wealth without fees':>22}{'Wealth with fees':>22}{'Fee cost':>22}")
+    for percentile in result.percentiles:
+        print(f"{percentile:>10}{result.wealth_no_fees[percentile]:>22,.2f}"
+              f"{result.wealth_with_fees[percentile]:>22,.2f}{result.fee_cost[percentile]:>22,.2f}")
+    print(f"{'Mean':>10}{result.mean_wealth_no_fees:>22,.2f}"
+          f"{result.mean_wealth_with_fees:>22,.2f}{result.mean_fee_cost:>22,.2f}")
+    print(f"{'Std dev':>10}{math.sqrt(result.variance_wealth_no_fees):>22,.2f}"
+          f"{math.sqrt(result.variance_wealth_with_fees):>22,.2f}{math.sqrt(result.variance_fee_cost):>22,.2f}")
+    print(f"CVaR {result.cvar_level:.0%}: mean wealth with fees in the worst paths "
+          f"${result.cvar_wealth_with_fees:,.2f}, mean fee cost in the costliest ${result.cvar_fee_cost:,.2f}")
+    own_peak, worker_peak = peak_rss()
+    print(f"Simulated {paths:,} paths x {years} years in {seconds:.2f}s; peak RSS {own_peak / 2 ** 20:,.0f} MiB"
+          + (f", largest worker {worker_peak / 2 ** 20:,.0f} MiB" if workers > 1 else ""), file=sys.stderr)
+
+
+def run_fee_estimate(initial_value, fee_percentage, years, annual_return, paths, volatility,
+                     distribution='normal', degrees_of_freedom=5, seed=None, workers=1):
+    """Print the variance-reduced estimate of the expected fee cost"""
+    from montecarlo import ReturnDistribution, estimate_fee_cost
+
+    estimate = estimate_fee_cost(
+        initial_value, fee_percentage, years,
+        ReturnDistribution(distribution, annual_return, volatility, degrees_of_freedom), paths, seed, workers=workers
+    )
+    low, high = estimate.confidence_interval
+    print(f"Expected fee cost: ${estimate.mean:,.2f} (95% CI ${low:,.2f} to ${high:,.2f})")
+    print(f"Standard error ${estimate.standard_error:,.2f} versus ${estimate.plain_standard_error:,.2f} "
+          f"for plain Monte Carlo over {estimate.paths:,} paths: "
+          f"variance reduced {estimate.variance_reduction:,.1f}x")
+
+
+def run_fee_comparison(initial_value, fee_percentages, years, annual_return, paths, volatility,
+                       distribution='normal', degrees_of_freedom=5, seed=None, workers=1):
+    """Print fee levels side by side, evaluated on common simulated returns"""
+    from montecarlo import ReturnDistribution, compare_fees
+
+    comparison = compare_fees(
+        initial_value, fee_percentages, years,
+        ReturnDistribution(distribution, annual_return, volatility, degrees_of_freedom), paths, seed, workers=workers
+    )
+    print(f"{'Fee':>8}{'Median wealth':>18}{'Mean wealth':>18}{'Mean fee cost':>18}"
+          f"{'Shortfall vs ' + format(comparison.fee_percentages[0], '.2%'):>22}{'+/- common':>14}"
+          f"{'+/- separate':>14}")
+    for index, fee in enumerate(comparison.fee_percentages):
+        print(f"{fee:>8.2%}{comparison.wealth_with_fees[index][50]:>18,.2f}"
+              f"{comparison.mean_wealth_with_fees[index]:>18,.2f}{comparison.mean_fee_cost[index]:>18,.2f}"
+              f"{comparison.mean_difference[index]:>22,.2f}{comparison.standard_error_difference[index]:>14,.2f}"
+              f"{comparison.independent_standard_error_difference[index]:>14,.2f}")
+
+
+def main(argv=None):
+    """Parse arguments and run the requested command"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'montecarlo' and args.memory_budget is not None and (args.expected_fees or args.compare_fees):
+        parser.error("--memory-budget applies only to the percentile report, not --expected-fees or --compare-fees")
+    if args.command == 'batch':
+        run_batch(args.input, args.output, args.chunk_size, args.workers)
+    elif args.command == 'stream':
+        run_stream(args.batch_size)
+    elif args.command == 'serve':
+        run_serve(args.host, args.port, args.window_ms, args.cache_size)
+    elif args.command == 'montecarlo' and args.compare_fees:
+        run_fee_comparison(args.initial_value, args.compare_fees, args.years, args.annual_return, args.paths,
+                           args.volatility, args.distribution, args.degrees_of_freedom, args.seed, args.workers)
+    elif args.command == 'montecarlo' and args.expected_fees:
+        run_fee_estimate(args.initial_value, args.fee_percentage, args.years, args.annual_return, args.paths,
+                         args.volatility, args.distribution, args.degrees_of_freedom, args.seed, args.workers)
+    elif args.command == 'montecarlo':
+        run_montecarlo(args.initial_value, args.fee_percentage, args.years, args.annual_return, args.paths,
+                       args.volatility, args.distribution, args.degrees_of_freedom, args.seed, args.workers,
+                       args.streaming, args.memory_budget)
+    else:
+        report(args.initial_value, args.fee_percentage, args.years, args.annual_return, args.engine)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
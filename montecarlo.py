@@ -0,0 +1,638 @@
+"""Monte Carlo simulation of advisory fees under stochastic annual returns
+
+Each path draws an independent return for every year from a configurable
+distribution and compounds the balance by (1 + r) without fees and by
+(1 + r - fee_percentage) with fees, exactly as InvestmentCalculator's loop
+does for a fixed return. A year cannot lose more than the whole balance,
+so growth factors are floored at zero. Paths are simulated in fixed-size
+blocks as paths x years matrices, each block with its own random stream,
+optionally across worker processes, and the result reports percentile
+bands, moments and CVaR of the terminal wealth and of the fee cost across
+all paths. simulate_streaming() computes the same summary in constant
+memory for runs too large to keep every path, optionally within a memory
+budget.
+"""
+import math
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+# NumPy loads its random module on first use; load it now so that its code does not land in a run's memory budget
+import numpy.random
+
+from estimators import DEFAULT_COMPRESSION, RunningCovariance, RunningMoments, TDigest
+
+DISTRIBUTION_NORMAL = 'normal'
+DISTRIBUTION_LOGNORMAL = 'lognormal'
+DISTRIBUTION_STUDENT_T = 'student_t'
+DISTRIBUTIONS = (DISTRIBUTION_NORMAL, DISTRIBUTION_LOGNORMAL, DISTRIBUTION_STUDENT_T)
+
+DEFAULT_PATHS = 100_000
+# Paths per random stream; part of what a seed means, so changing it changes results
+BLOCK_PATHS = 32_768
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Per-path bytes of a streamed chunk besides its growth matrix: the two balances and the fee cost, plus the
+# seven float64 or index arrays of the chunk's length that a t-digest merge holds at its peak
+STREAMING_BYTES_PER_PATH = (3 + 7) * 8
+# Bytes per unit of t-digest compression that streaming needs whatever the chunk size: up to compression / 2
+# centroids of two float64s in each of the three digests of a block's aggregator and of the running total, and
+# the merge temporaries over those centroids, rounded up to cover tracemalloc measurements
+STREAMING_BYTES_PER_COMPRESSION = 112
+# Small arrays and Python objects of the estimators and the block plan
+STREAMING_FIXED_BYTES = 64 * 1024
+
+# How worker processes hand their terminal balances back to the parent
+TRANSPORT_SHARED_MEMORY = 'shared_memory'
+TRANSPORT_PICKLE = 'pickle'
+TRANSPORTS = (TRANSPORT_SHARED_MEMORY, TRANSPORT_PICKLE)
+
+ReturnDistribution = namedtuple(
+    'ReturnDistribution', ['kind', 'mean', 'volatility', 'degrees_of_freedom'],
+    defaults=(DISTRIBUTION_NORMAL, 0.05, 0.15, None)
+)
+ReturnDistribution.__doc__ = """Annual return distribution with the given arithmetic mean and standard deviation
+
+kind 'normal' draws r ~ N(mean, volatility); 'lognormal' draws 1 + r from
+the lognormal with that mean and standard deviation, so a year never loses
+everything; 'student_t' draws fat-tailed returns scaled to the same
+standard deviation, which needs degrees_of_freedom > 2.
+"""
+
+DEFAULT_CVAR_LEVEL = 0.05
+
+MonteCarloResult = namedtuple(
+    'MonteCarloResult',
+    [
+        'paths', 'percentiles', 'wealth_no_fees', 'wealth_with_fees', 'fee_cost',
+        'mean_wealth_no_fees', 'mean_wealth_with_fees', 'mean_fee_cost',
+        'variance_wealth_no_fees', 'variance_wealth_with_fees', 'variance_fee_cost',
+        'cvar_level', 'cvar_wealth_with_fees', 'cvar_fee_cost',
+    ]
+)
+MonteCarloResult.__doc__ = """Summary of a Monte Carlo run
+
+cvar_wealth_with_fees is the mean wealth with fees over the worst
+cvar_level fraction of paths and cvar_fee_cost the mean fee cost over the
+costliest cvar_level fraction.
+"""
+
+
+def validate_distribution(distribution):
+    """Raise ValueError unless distribution can be sampled"""
+    if distribution.kind not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution {distribution.kind!r}; expected one of {DISTRIBUTIONS}")
+    if distribution.volatility < 0:
+        raise ValueError(f"Volatility must be non-negative, got {distribution.volatility}")
+    if distribution.kind == DISTRIBUTION_LOGNORMAL and distribution.mean <= -1:
+        raise ValueError(f"A lognormal mean return must exceed -100%, got {distribution.mean}")
+    if distribution.kind == DISTRIBUTION_STUDENT_T and not (distribution.degrees_of_freedom or 0) > 2:
+        raise ValueError(
+            f"Student's t returns need more than 2 degrees of freedom, got {distribution.degrees_of_freedom}"
+        )
+
+
+def draw_growth(rng, distribution, out):
+    """Fill out with gross annual growth factors 1 + r drawn from distribution"""
+    mean, volatility = distribution.mean, distribution.volatility
+    if distribution.kind == DISTRIBUTION_LOGNORMAL:
+        sigma_squared = math.log1p((volatility / (1 + mean)) ** 2)
+        rng.standard_normal(out=out)
+        out *= math.sqrt(sigma_squared)
+        out += math.log1p(mean) - sigma_squared / 2
+        np.exp(out, out=out)
+        return out
+    if distribution.kind == DISTRIBUTION_STUDENT_T:
+        df = distribution.degrees_of_freedom
+        out[...] = rng.standard_t(df, size=out.shape)
+        volatility *= math.sqrt((df - 2) / df)
+    else:
+        rng.standard_normal(out=out)
+    out *= volatility
+    out += 1 + mean
+    return out
+
+
+def block_seeds(seed, blocks):
+    """Return one independent SeedSequence per block of paths, derived from seed
+
+    Children are built from the root's spawn key rather than with spawn(),
+    so the same seed always yields the same streams even when a caller
+    passes one SeedSequence to several runs.
+    """
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [
+        np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (index,), pool_size=root.pool_size)
+        for index in range(blocks)
+    ]
+
+
+def mirror_growth(distribution, growth, out=None):
+    """Return the antithetic counterparts of growth factors drawn from distribution
+
+    Normal and Student's t returns are reflected about the mean; lognormal
+    growth is reflected in log space, so each pair shares one draw of
+    opposite sign.
+    """
+    if distribution.kind == DISTRIBUTION_LOGNORMAL:
+        sigma_squared = math.log1p((distribution.volatility / (1 + distribution.mean)) ** 2)
+        # exp(m + s z) -> exp(m - s z) = exp(2 m) / exp(m + s z)
+        return np.divide(math.exp(2 * (math.log1p(distribution.mean) - sigma_squared / 2)), growth, out=out)
+    return np.subtract(2 * (1 + distribution.mean), growth, out=out)
+
+
+def _compound(growth, initial_value, fee_percentage, no_fees, with_fees):
+    """Compound paths x years growth factors (overwritten) into terminal balances without and with fees"""
+    np.maximum(growth, 0, out=growth)
+    np.prod(growth, axis=1, out=no_fees)
+    growth -= fee_percentage
+    np.maximum(growth, 0, out=growth)
+    np.prod(growth, axis=1, out=with_fees)
+    no_fees *= initial_value
+    with_fees *= initial_value
+
+
+def _simulate_chunk(initial_value, fee_percentage, years, distribution, rng, no_fees, with_fees, buffer=None):
+    """Fill no_fees and with_fees with the terminal balances of the next paths drawn from rng"""
+    paths = no_fees.shape[0]
+    buffer = np.empty(years * paths) if buffer is None else buffer[:years * paths]
+    # Each path's years are drawn consecutively, so splitting a block into chunks draws the same numbers
+    growth = draw_growth(rng, distribution, buffer.reshape(paths, years))
+    _compound(growth, initial_value, fee_percentage, no_fees, with_fees)
+
+
+def _simulate_block(initial_value, fee_percentage, years, distribution, seed_sequence, no_fees, with_fees,
+                    buffer=None):
+    """Fill no_fees and with_fees with the terminal balances of one block of paths"""
+    _simulate_chunk(initial_value, fee_percentage, years, distribution, np.random.default_rng(seed_sequence),
+                    no_fees, with_fees, buffer)
+
+
+def _simulate_block_task(initial_value, fee_percentage, years, distribution, seed_sequence, paths):
+    """Simulate one block in a worker process and return its two balance arrays"""
+    no_fees = np.empty(paths)
+    with_fees = np.empty(paths)
+    _simulate_block(initial_value, fee_percentage, years, distribution, seed_sequence, no_fees, with_fees)
+    return no_fees, with_fees
+
+
+def _plan_blocks(distribution, paths, years, seed, block_paths):
+    """Validate a run and return the start, size and seed of every block"""
+    validate_distribution(distribution)
+    if paths < 1:
+        raise ValueError(f"Path count must be positive, got {paths}")
+    if years < 0:
+        raise ValueError(f"Years must be non-negative, got {years}")
+    starts = range(0, paths, block_paths)
+    sizes = [min(block_paths, paths - start) for start in starts]
+    return starts, sizes, block_seeds(seed, len(sizes))
+
+
+def simulate_paths(initial_value, fee_percentage, years, distribution, paths, seed=None, workers=1,
+                   block_paths=BLOCK_PATHS):
+    """Return the terminal balance of every path without and with fees, as two arrays
+
+    Paths are split into blocks of block_paths, each drawn from its own
+    random stream spawned from seed, so the result for a given seed and
+    block size is bit-identical whether the blocks run in this process or
+    across any number of worker processes. Workers send their blocks back
+    pickled; see shared_paths() for the zero-copy alternative.
+    """
+    starts, sizes, seeds = _plan_blocks(distribution, paths, years, seed, block_paths)
+    no_fees = np.empty(paths)
+    with_fees = np.empty(paths)
+    if workers > 1:
+        count = len(sizes)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            blocks = pool.map(
+                _simulate_block_task,
+                [initial_value] * count, [fee_percentage] * count, [years] * count, [distribution] * count,
+                seeds, sizes,
+            )
+            for start, (block_no_fees, block_with_fees) in zip(starts, blocks):
+                no_fees[start:start + block_no_fees.shape[0]] = block_no_fees
+                with_fees[start:start + block_with_fees.shape[0]] = block_with_fees
+    else:
+        buffer = np.empty(years * sizes[0])
+        for start, size, seed_sequence in zip(starts, sizes, seeds):
+            _simulate_block(initial_value, fee_percentage, years, distribution, seed_sequence,
+                            no_fees[start:start + size], with_fees[start:start + size], buffer)
+    return no_fees, with_fees
+
+
+def _simulate_block_shared(name, paths, start, initial_value, fee_percentage, years, distribution, seed_sequence,
+                           size):
+    """Simulate one block in a worker process straight into the parent's shared balances"""
+    block = shared_memory.SharedMemory(name=name)
+    balances = np.ndarray((2, paths), buffer=block.buf)
+    try:
+        _simulate_block(initial_value, fee_percentage, years, distribution, seed_sequence,
+                        balances[0, start:start + size], balances[1, start:start + size])
+    finally:
+        del balances
+        block.close()
+
+
+@contextmanager
+def shared_paths(initial_value, fee_percentage, years, distribution, paths, seed=None, workers=2,
+                 block_paths=BLOCK_PATHS):
+    """Simulate across workers into shared memory and yield the two terminal balance arrays
+
+    The parent allocates one shared block holding both arrays and every
+    worker writes its paths into it in place, so nothing is pickled or
+    copied on the way back and peak memory is the shared block (16 bytes
+    per path) plus one block buffer per worker. With pickling, every block
+    additionally exists as the worker's arrays, the pickle and the parent's
+    unpickled copy, and finished blocks queue in the parent whenever the
+    workers outpace it. The arrays are views of the shared block and are
+    only valid inside the with statement. Results equal simulate_paths()
+    with the same seed and block size.
+    """
+    starts, sizes, seeds = _plan_blocks(distribution, paths, years, seed, block_paths)
+    block = shared_memory.SharedMemory(create=True, size=2 * paths * np.dtype(np.float64).itemsize)
+    balances = np.ndarray((2, paths), buffer=block.buf)
+    try:
+        count = len(sizes)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Consume the results so a failing worker raises here
+            for _ in pool.map(
+                _simulate_block_shared,
+                [block.name] * count, [paths] * count, starts, [initial_value] * count, [fee_percentage] * count,
+                [years] * count, [distribution] * count, seeds, sizes,
+            ):
+                pass
+        yield balances[0], balances[1]
+    finally:
+        del balances
+        try:
+            block.close()
+        except BufferError:
+            # The caller kept a view; the mapping is released when it goes away
+            pass
+        block.unlink()
+
+
+class PathAggregator:
+    """Streaming summary of terminal balances in constant memory
+
+    Keeps a t-digest and running moments of wealth without fees, wealth
+    with fees and fee cost. Aggregators of separate blocks of paths merge
+    into the aggregator of all of them.
+    """
+
+    __slots__ = ('digests', 'moments')
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.digests = tuple(TDigest(compression) for _ in range(3))
+        self.moments = tuple(RunningMoments() for _ in range(3))
+
+    def update(self, no_fees, with_fees):
+        """Add the terminal balances of a batch of paths"""
+        for digest, moments, values in zip(self.digests, self.moments, (no_fees, with_fees, no_fees - with_fees)):
+            digest.update(values)
+            moments.update(values)
+
+    def merge(self, other):
+        """Add everything accumulated by another PathAggregator"""
+        for digest, other_digest in zip(self.digests, other.digests):
+            digest.merge(other_digest)
+        for moments, other_moments in zip(self.moments, other.moments):
+            moments.merge(other_moments)
+
+    def result(self, percentiles=DEFAULT_PERCENTILES, cvar_level=DEFAULT_CVAR_LEVEL):
+        """Return the MonteCarloResult of the paths seen so far"""
+        percentiles = tuple(percentiles)
+        no_fees, with_fees, fee_cost = self.digests
+        bands = [dict(zip(percentiles, digest.percentile(percentiles).tolist())) for digest in self.digests]
+        return MonteCarloResult(
+            no_fees.count, percentiles, *bands,
+            *(moments.mean for moments in self.moments),
+            *(moments.variance for moments in self.moments),
+            cvar_level, with_fees.tail_mean(cvar_level), fee_cost.tail_mean(cvar_level, upper=True),
+        )
+
+
+def _tail_mean(values, level, upper=False):
+    """Exact mean of the lowest (or highest) fraction level of values"""
+    count = max(1, math.ceil(level * values.shape[0]))
+    if upper:
+        return float(np.partition(values, values.shape[0] - count)[-count:].mean())
+    return float(np.partition(values, count - 1)[:count].mean())
+
+
+def summarize(no_fees, with_fees, percentiles=DEFAULT_PERCENTILES, cvar_level=DEFAULT_CVAR_LEVEL):
+    """Return the exact MonteCarloResult for arrays of terminal balances"""
+    fee_cost = no_fees - with_fees
+    percentiles = tuple(percentiles)
+    series = (no_fees, with_fees, fee_cost)
+    moments = [RunningMoments() for _ in series]
+    for estimator, values in zip(moments, series):
+        estimator.update(values)
+    return MonteCarloResult(
+        no_fees.shape[0], percentiles,
+        *(dict(zip(percentiles, np.percentile(values, percentiles).tolist())) for values in series),
+        *(estimator.mean for estimator in moments),
+        *(estimator.variance for estimator in moments),
+        cvar_level, _tail_mean(with_fees, cvar_level), _tail_mean(fee_cost, cvar_level, upper=True),
+    )
+
+
+def simulate(initial_value, fee_percentage, years, distribution=ReturnDistribution(), paths=DEFAULT_PATHS,
+             seed=None, percentiles=DEFAULT_PERCENTILES, workers=1, block_paths=BLOCK_PATHS,
+             transport=TRANSPORT_SHARED_MEMORY, cvar_level=DEFAULT_CVAR_LEVEL):
+    """Simulate paths and summarize terminal wealth and fee cost
+
+    The wealth_no_fees, wealth_with_fees and fee_cost fields map each
+    requested percentile to its value across paths. Runs with the same seed
+    are reproducible regardless of the number of worker processes. With
+    more than one worker, transport chooses whether their results come
+    back through shared memory (the default) or pickled.
+    """
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport {transport!r}; expected one of {TRANSPORTS}")
+    if workers > 1 and transport == TRANSPORT_SHARED_MEMORY:
+        with shared_paths(initial_value, fee_percentage, years, distribution, paths, seed, workers,
+                          block_paths) as (no_fees, with_fees):
+            return summarize(no_fees, with_fees, percentiles, cvar_level)
+    no_fees, with_fees = simulate_paths(
+        initial_value, fee_percentage, years, distribution, paths, seed, workers, block_paths
+    )
+    return summarize(no_fees, with_fees, percentiles, cvar_level)
+
+
+def chunk_paths_for_budget(memory_budget, years, distribution, compression=DEFAULT_COMPRESSION):
+    """Return how many paths to simulate at once so their working set fits in memory_budget bytes"""
+    # Growth matrix (twice over for Student's t, whose draws cannot be written in place) plus per-path vectors
+    row_bytes = years * np.dtype(np.float64).itemsize * (2 if distribution.kind == DISTRIBUTION_STUDENT_T else 1)
+    # The digests cost the same however small the chunks are, so they come off the top
+    fixed_bytes = STREAMING_FIXED_BYTES + STREAMING_BYTES_PER_COMPRESSION * compression
+    chunk_paths = (memory_budget - fixed_bytes) // (row_bytes + STREAMING_BYTES_PER_PATH)
+    if chunk_paths < 1:
+        raise ValueError(
+            f"A memory budget of {memory_budget} bytes cannot hold the streaming estimators ({fixed_bytes} bytes) "
+            f"and one {years}-year path ({row_bytes + STREAMING_BYTES_PER_PATH} bytes)"
+        )
+    return int(chunk_paths)
+
+
+def _aggregate_block(initial_value, fee_percentage, years, distribution, seed_sequence, paths, compression,
+                     chunk_paths=None, buffer=None):
+    """Simulate one block of paths, chunk_paths at a time, and return its PathAggregator"""
+    rng = np.random.default_rng(seed_sequence)
+    chunk_paths = min(chunk_paths or paths, paths)
+    no_fees = np.empty(chunk_paths)
+    with_fees = np.empty(chunk_paths)
+    aggregator = PathAggregator(compression)
+    for start in range(0, paths, chunk_paths):
+        size = min(chunk_paths, paths - start)
+        _simulate_chunk(initial_value, fee_percentage, years, distribution, rng, no_fees[:size], with_fees[:size],
+                        buffer)
+        aggregator.update(no_fees[:size], with_fees[:size])
+    return aggregator
+
+
+def simulate_streaming(initial_value, fee_percentage, years, distribution=ReturnDistribution(), paths=DEFAULT_PATHS,
+                       seed=None, percentiles=DEFAULT_PERCENTILES, workers=1, block_paths=BLOCK_PATHS,
+                       cvar_level=DEFAULT_CVAR_LEVEL, compression=DEFAULT_COMPRESSION, memory_budget=None):
+    """Simulate paths in constant memory, summarizing them with streaming estimators
+
+    No per-path arrays outlive their block: each block is reduced to a
+    PathAggregator and merged in block order, so memory does not grow with
+    paths and the result for a seed is the same for any worker count.
+    Means and variances match simulate() to rounding; percentiles and CVaR
+    are t-digest estimates.
+
+    memory_budget caps, in bytes, the simulation working set of each
+    process (the interpreter and NumPy themselves come on top): blocks are
+    then simulated in chunks small enough to fit. The paths drawn do not
+    depend on the budget, though the digests see them in different batches.
+    """
+    starts, sizes, seeds = _plan_blocks(distribution, paths, years, seed, block_paths)
+    chunk_paths = sizes[0]
+    if memory_budget is not None:
+        chunk_paths = min(chunk_paths, chunk_paths_for_budget(memory_budget, years, distribution, compression))
+    count = len(sizes)
+    total = PathAggregator(compression)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for aggregator in pool.map(
+                _aggregate_block,
+                [initial_value] * count, [fee_percentage] * count, [years] * count, [distribution] * count,
+                seeds, sizes, [compression] * count, [chunk_paths] * count,
+            ):
+                total.merge(aggregator)
+    else:
+        buffer = np.empty(years * chunk_paths)
+        for seed_sequence, size in zip(seeds, sizes):
+            total.merge(_aggregate_block(initial_value, fee_percentage, years, distribution, seed_sequence, size,
+                                         compression, chunk_paths, buffer))
+    return total.result(percentiles, cvar_level)
+
+
+def peak_rss():
+    """Return the peak resident set size in bytes of this process and of its largest finished child"""
+    import resource
+    import sys
+
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+FeeCostEstimate = namedtuple(
+    'FeeCostEstimate',
+    ['mean', 'standard_error', 'confidence_interval', 'paths', 'plain_standard_error', 'variance_reduction']
+)
+FeeCostEstimate.__doc__ = """Estimate of the expected fee cost with its precision
+
+plain_standard_error is what plain Monte Carlo with the same number of
+simulated paths would achieve, and variance_reduction is the ratio of its
+square to the square of standard_error: how many times more paths plain
+Monte Carlo would need for the same precision.
+"""
+
+
+def _fee_cost_block(initial_value, fee_percentage, years, distribution, seed_sequence, paths, antithetic):
+    """Simulate one block and return (moments of every path's fee cost, covariance of fee cost and control samples)"""
+    draws = (paths + 1) // 2 if antithetic else paths
+    growth = draw_growth(np.random.default_rng(seed_sequence), distribution, np.empty((draws, years)))
+    if antithetic:
+        growth = np.concatenate([growth, mirror_growth(distribution, growth)])
+    # The control: wealth with fees compounded without the floor, whose expectation is known exactly
+    control = initial_value * np.prod(growth - fee_percentage, axis=1)
+    no_fees = np.empty(growth.shape[0])
+    with_fees = np.empty(growth.shape[0])
+    _compound(growth, initial_value, fee_percentage, no_fees, with_fees)
+    fee_cost = no_fees - with_fees
+    plain = RunningMoments()
+    plain.update(fee_cost)
+    if antithetic:
+        # Each antithetic pair is one sample
+        fee_cost = (fee_cost[:draws] + fee_cost[draws:]) / 2
+        control = (control[:draws] + control[draws:]) / 2
+    samples = RunningCovariance()
+    samples.update(fee_cost, control)
+    return plain, samples
+
+
+def estimate_fee_cost(initial_value, fee_percentage, years, distribution=ReturnDistribution(), paths=DEFAULT_PATHS,
+                      seed=None, antithetic=True, control_variate=True, confidence=0.95, workers=1,
+                      block_paths=BLOCK_PATHS):
+    """Estimate the expected fee cost with variance reduction
+
+    With antithetic set, every drawn path is paired with its mirror image
+    (see mirror_growth()) and each pair counts as one sample. With
+    control_variate set, the sample mean is corrected by its regression on
+    the wealth with fees compounded without the zero floor on growth
+    factors, whose expectation over independent years is exactly
+    InvestmentCalculator(initial_value, fee_percentage, years,
+    distribution.mean).future_value_with_fees(), so the correction adds no
+    bias even for fat-tailed returns that hit the floor.
+    """
+    from statistics import NormalDist
+
+    from calculator import InvestmentCalculator
+
+    if not 0 < confidence < 1:
+        raise ValueError(f"Confidence must be between 0 and 1, got {confidence}")
+    starts, sizes, seeds = _plan_blocks(distribution, paths, years, seed, block_paths)
+    count = len(sizes)
+    arguments = (
+        [initial_value] * count, [fee_percentage] * count, [years] * count, [distribution] * count,
+        seeds, sizes, [antithetic] * count,
+    )
+    plain = RunningMoments()
+    samples = RunningCovariance()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            blocks = list(pool.map(_fee_cost_block, *arguments))
+    else:
+        blocks = map(_fee_cost_block, *arguments)
+    for block_plain, block_samples in blocks:
+        plain.merge(block_plain)
+        samples.merge(block_samples)
+
+    mean = samples.mean_x
+    residual_variance = samples.variance_x
+    if control_variate and samples.variance_y > 0:
+        expected_wealth = InvestmentCalculator(
+            initial_value, fee_percentage, years, distribution.mean
+        ).future_value_with_fees()
+        beta = samples.covariance / samples.variance_y
+        mean -= beta * (samples.mean_y - expected_wealth)
+        residual_variance = max(residual_variance - beta * samples.covariance, 0.0)
+    standard_error = math.sqrt(residual_variance / samples.count)
+    plain_standard_error = math.sqrt(plain.variance / plain.count)
+    half_width = NormalDist().inv_cdf((1 + confidence) / 2) * standard_error
+    if standard_error:
+        variance_reduction = (plain_standard_error / standard_error) ** 2
+    else:
+        variance_reduction = math.inf if plain_standard_error else 1.0
+    return FeeCostEstimate(
+        mean, standard_error, (mean - half_width, mean + half_width), plain.count, plain_standard_error,
+        variance_reduction,
+    )
+
+
+FeeComparison = namedtuple(
+    'FeeComparison',
+    [
+        'fee_percentages', 'paths', 'percentiles', 'wealth_with_fees', 'mean_wealth_with_fees', 'mean_fee_cost',
+        'mean_difference', 'standard_error_difference', 'independent_standard_error_difference',
+    ]
+)
+FeeComparison.__doc__ = """Fee levels evaluated on common return paths
+
+Every field after percentiles holds one entry per fee level, in order:
+wealth_with_fees maps percentiles to values and mean_difference is the
+mean shortfall of wealth with fees against the first fee level.
+standard_error_difference is its standard error from the common paths and
+independent_standard_error_difference what separate simulations of the
+same size would give.
+"""
+
+
+class _FeeLevelAggregator:
+    """Streaming statistics of one fee level across blocks of common paths"""
+
+    __slots__ = ('digest', 'wealth', 'fee_cost', 'difference')
+
+    def __init__(self, compression):
+        self.digest = TDigest(compression)
+        self.wealth = RunningMoments()
+        self.fee_cost = RunningMoments()
+        self.difference = RunningMoments()
+
+    def update(self, no_fees, with_fees, baseline_with_fees):
+        self.digest.update(with_fees)
+        self.wealth.update(with_fees)
+        self.fee_cost.update(no_fees - with_fees)
+        self.difference.update(baseline_with_fees - with_fees)
+
+    def merge(self, other):
+        self.digest.merge(other.digest)
+        self.wealth.merge(other.wealth)
+        self.fee_cost.merge(other.fee_cost)
+        self.difference.merge(other.difference)
+
+
+def _compare_block(initial_value, fee_percentages, years, distribution, seed_sequence, paths, compression):
+    """Simulate one block of return paths once and aggregate every fee level on them"""
+    growth = draw_growth(np.random.default_rng(seed_sequence), distribution, np.empty((paths, years)))
+    np.maximum(growth, 0, out=growth)
+    no_fees = initial_value * np.prod(growth, axis=1)
+    # fee levels x paths x years: every fee compounds the same draws in one broadcast pass
+    net = growth[np.newaxis] - fee_percentages[:, np.newaxis, np.newaxis]
+    np.maximum(net, 0, out=net)
+    with_fees = initial_value * np.prod(net, axis=2)
+    levels = [_FeeLevelAggregator(compression) for _ in fee_percentages]
+    for level, level_with_fees in zip(levels, with_fees):
+        level.update(no_fees, level_with_fees, with_fees[0])
+    return levels
+
+
+def compare_fees(initial_value, fee_percentages, years, distribution=ReturnDistribution(), paths=DEFAULT_PATHS,
+                 seed=None, percentiles=DEFAULT_PERCENTILES, workers=1, block_paths=BLOCK_PATHS,
+                 compression=DEFAULT_COMPRESSION):
+    """Evaluate several fee levels against the same simulated return paths
+
+    Returns are drawn once per path and every fee level is compounded on
+    them, so differences between fee levels carry none of the noise of
+    independent draws and converge with far fewer paths. For a given seed
+    each level's paths are those simulate() draws for it alone. Summaries
+    are streamed, so memory is bounded by one block times the number of
+    fee levels.
+    """
+    fee_percentages = np.atleast_1d(np.asarray(fee_percentages, dtype=np.float64))
+    if fee_percentages.ndim != 1 or not fee_percentages.size:
+        raise ValueError("fee_percentages must be a non-empty 1-D sequence")
+    starts, sizes, seeds = _plan_blocks(distribution, paths, years, seed, block_paths)
+    count = len(sizes)
+    arguments = (
+        [initial_value] * count, [fee_percentages] * count, [years] * count, [distribution] * count,
+        seeds, sizes, [compression] * count,
+    )
+    levels = [_FeeLevelAggregator(compression) for _ in fee_percentages]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            blocks = list(pool.map(_compare_block, *arguments))
+    else:
+        blocks = map(_compare_block, *arguments)
+    for block_levels in blocks:
+        for level, block_level in zip(levels, block_levels):
+            level.merge(block_level)
+
+    percentiles = tuple(percentiles)
+    baseline_variance = levels[0].wealth.variance
+    return FeeComparison(
+        tuple(fee_percentages.tolist()), paths, percentiles,
+        tuple(dict(zip(percentiles, level.digest.percentile(percentiles).tolist())) for level in levels),
+        tuple(level.wealth.mean for level in levels),
+        tuple(level.fee_cost.mean for level in levels),
+        tuple(level.difference.mean for level in levels),
+        tuple(math.sqrt(level.difference.variance / paths) for level in levels),
+        tuple(math.sqrt((baseline_variance + level.wealth.variance) / paths) for level in levels),
+    )
@@ -0,0 +1,198 @@
+"""Opt-in call counts and timings for the calculator's hot paths
+
+Nothing is wrapped until profiling is enabled, so there is no overhead at
+all while it is off. enable() replaces the target functions with timing
+wrappers (on their class or module, and wherever they were already
+imported by name) and disable() puts the originals back.
+
+Setting CALCULATOR_PROFILE to a file path enables profiling when
+calculator.py is first imported (which imports the other target modules)
+and dumps the results there at exit, as pstats data if the path ends in
+.prof or .pstats and as JSON otherwise. Worker processes of a pool dump
+their own results at exit too; a {pid} placeholder in the path keeps them
+from overwriting each other's.
+"""
+import functools
+import importlib
+import json
+import marshal
+import os
+import sys
+import time
+from collections import namedtuple
+from multiprocessing import util
+
+
+PROFILE_ENV = 'CALCULATOR_PROFILE'
+
+# (module, qualified name) of every instrumented function
+TARGETS = (
+    ('calculator', 'InvestmentCalculator.compute'),
+    ('calculator', 'InvestmentCalculator.future_value_no_fees'),
+    ('calculator', 'InvestmentCalculator.future_value_with_fees'),
+    ('calculator', 'InvestmentCalculator.total_fees_paid'),
+    ('calculator', 'InvestmentCalculator.opportunity_cost'),
+    ('vectorized', 'evaluate_batch'),
+    ('vectorized', 'evaluate_horizons'),
+    ('vectorized', 'fee_ledger'),
+    ('scoring', 'score_lines'),
+    ('scoring', 'score_json_lines'),
+)
+
+ProfileEntry = namedtuple('ProfileEntry', ['calls', 'wall_seconds', 'cpu_seconds'])
+
+
+class _Stats:
+    """Mutable accumulator for one instrumented function"""
+
+    __slots__ = ('calls', 'wall', 'cpu', 'code')
+
+    def __init__(self, code):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.code = code
+
+
+_stats = {}
+_enabled = False
+# Where enable_from_environment() dumps at exit
+_dump_path = None
+# (owner, attribute, original, wrapper) for every binding replaced by enable()
+_patches = []
+
+
+def _wrap(name, function):
+    """Return a wrapper recording calls and wall/CPU time of function under name"""
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = _Stats(function.__code__)
+    perf_counter = time.perf_counter
+    process_time = time.process_time
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        wall_start = perf_counter()
+        cpu_start = process_time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats.cpu += process_time() - cpu_start
+            stats.wall += perf_counter() - wall_start
+            stats.calls += 1
+
+    return wrapper
+
+
+def is_enabled():
+    """Return True while the targets are instrumented"""
+    return _enabled
+
+
+def enable():
+    """Instrument every target whose module can be imported and has finished importing"""
+    global _enabled
+    if _enabled:
+        return
+    # Set first: importing a target module below can re-enter through its environment hook
+    _enabled = True
+    for module_name, qualified_name in TARGETS:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        *path, attribute = qualified_name.split('.')
+        owner = functools.reduce(lambda owner, part: getattr(owner, part, None), path, module)
+        original = getattr(owner, attribute, None)
+        if original is None:
+            # The module is still being imported (it imported the module that enabled profiling)
+            # and has not defined this target yet, so leave it alone
+            continue
+        wrapper = _wrap(f'{module_name}.{qualified_name}', original)
+        setattr(owner, attribute, wrapper)
+        _patches.append((owner, attribute, original, wrapper))
+        if not path:
+            # Also rebind copies made by "from module import function"
+            for other in list(sys.modules.values()):
+                if other is not module and vars(other).get(attribute) is original:
+                    setattr(other, attribute, wrapper)
+                    _patches.append((other, attribute, original, wrapper))
+
+
+def disable():
+    """Restore the original functions, keeping the statistics gathered so far"""
+    global _enabled
+    _enabled = False
+    while _patches:
+        owner, attribute, original, wrapper = _patches.pop()
+        if getattr(owner, attribute, None) is wrapper:
+            setattr(owner, attribute, original)
+
+
+def reset():
+    """Discard the statistics gathered so far"""
+    for stats in _stats.values():
+        stats.calls = 0
+        stats.wall = 0.0
+        stats.cpu = 0.0
+
+
+def snapshot():
+    """Return {function name: ProfileEntry} for every function called so far"""
+    return {
+        name: ProfileEntry(stats.calls, stats.wall, stats.cpu)
+        for name, stats in _stats.items() if stats.calls
+    }
+
+
+def dump_json(path):
+    """Write the statistics as JSON"""
+    with open(path, 'w') as output_file:
+        json.dump({name: entry._asdict() for name, entry in snapshot().items()}, output_file, indent=2)
+
+
+def dump_pstats(path):
+    """Write the statistics in the format read by pstats.Stats
+
+    Only cumulative wall time is recorded, so pstats shows it as both the
+    total and the cumulative time of each function.
+    """
+    data = {}
+    for name, stats in _stats.items():
+        if stats.calls:
+            code = stats.code
+            key = (code.co_filename, code.co_firstlineno, name)
+            data[key] = (stats.calls, stats.calls, stats.wall, stats.wall, {})
+    with open(path, 'wb') as output_file:
+        marshal.dump(data, output_file)
+
+
+def dump(path):
+    """Write the statistics as pstats data (.prof/.pstats) or JSON (anything else)"""
+    path = path.format(pid=os.getpid())
+    if path.endswith(('.prof', '.pstats')):
+        dump_pstats(path)
+    else:
+        dump_json(path)
+
+
+def enable_from_environment():
+    """Enable profiling and register an exit dump, also in forked workers, if CALCULATOR_PROFILE is set"""
+    global _dump_path
+    path = os.environ.get(PROFILE_ENV)
+    if path and not is_enabled():
+        enable()
+        _dump_path = path
+        _register_dump()
+        util.register_after_fork(sys.modules[__name__], _after_fork)
+
+
+def _register_dump():
+    # Pool workers leave through os._exit, which skips atexit handlers but not multiprocessing finalizers
+    util.Finalize(None, dump, (_dump_path,), exitpriority=0)
+
+
+def _after_fork(module):
+    """Start a forked worker with empty statistics and its own exit dump"""
+    reset()
+    _register_dump()
@@ -0,0 +1,274 @@
+"""Bounded-memory batch scoring of whole client books"""
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from vectorized import evaluate_batch
+
+
+INPUT_COLUMNS = ('initial_value', 'fee_percentage', 'annual_return', 'years')
+RESULT_COLUMNS = ('future_value_no_fees', 'future_value_with_fees', 'total_fees_paid', 'opportunity_cost')
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_MICRO_BATCH = 4096
+# Shards per worker, so faster workers pick up the slack of slower ones
+SHARDS_PER_WORKER = 4
+_READ_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+class ScoreSummary(namedtuple('ScoreSummary', ['rows', 'seconds'])):
+    """Row count and elapsed wall time of a scoring run"""
+
+    __slots__ = ()
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+_ROW_FORMAT = '{},{:.2f},{:.2f},{:.2f},{:.2f}\n'.format
+_JSON_SUFFIX_FORMAT = (
+    '{0},"future_value_no_fees":{1!r},"future_value_with_fees":{2!r},'
+    '"total_fees_paid":{3},"opportunity_cost":{3}}}\n'
+).format
+
+
+def _column_indices(header):
+    """Locate the input columns in a CSV header line"""
+    names = [name.strip() for name in next(csv.reader([header]))]
+    missing = [column for column in INPUT_COLUMNS if column not in names]
+    if missing:
+        raise ValueError(f"Input CSV is missing column(s): {', '.join(missing)}")
+    return [names.index(column) for column in INPUT_COLUMNS]
+
+
+def score_lines(lines, columns):
+    """Score a list of CSV data lines, returning the output text
+
+    Each output line is the input line with the four result columns
+    appended, rounded to cents. Fields may be double-quoted, so an extra
+    column such as "Smith, John" does not shift the input columns.
+    """
+    data = np.loadtxt(lines, delimiter=',', quotechar='"', usecols=columns, ndmin=2)
+    initial_value, fee_percentage, annual_return, years = data.T
+    result = evaluate_batch(initial_value, fee_percentage, years, annual_return)
+    stripped = [line.rstrip('\r\n') for line in lines]
+    return ''.join(map(_ROW_FORMAT, stripped, *(field.tolist() for field in result)))
+
+
+def score_csv(input_file, output_file, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score a CSV of accounts chunk by chunk, streaming results to output_file
+
+    input_file and output_file are open text files. The input must have a
+    header naming the INPUT_COLUMNS (in any order, extra columns allowed);
+    at most chunk_size rows are held in memory at a time.
+    """
+    start = time.perf_counter()
+    header = input_file.readline()
+    if not header.strip():
+        return ScoreSummary(0, time.perf_counter() - start)
+    columns = _column_indices(header)
+    output_file.write(header.rstrip('\r\n') + ',' + ','.join(RESULT_COLUMNS) + '\n')
+    rows = 0
+    while True:
+        chunk = list(islice(input_file, chunk_size))
+        if not chunk:
+            break
+        lines = [line for line in chunk if line.strip()]
+        if not lines:
+            continue
+        output_file.write(score_lines(lines, columns))
+        rows += len(lines)
+    return ScoreSummary(rows, time.perf_counter() - start)
+
+
+def _shard_offsets(input_file, data_start, shards):
+    """Split the bytes after the header into ranges that start on line boundaries"""
+    size = input_file.seek(0, os.SEEK_END)
+    offsets = [data_start]
+    for shard in range(1, shards):
+        input_file.seek(data_start + (size - data_start) * shard // shards)
+        input_file.readline()
+        offset = min(input_file.tell(), size)
+        if offset > offsets[-1]:
+            offsets.append(offset)
+    if size > offsets[-1]:
+        offsets.append(size)
+    return list(zip(offsets, offsets[1:]))
+
+
+def _iter_line_blocks(input_file, start, end):
+    """Yield lists of complete text lines from the byte range [start, end)"""
+    input_file.seek(start)
+    remaining = end - start
+    partial = b''
+    while remaining > 0:
+        block = input_file.read(min(_READ_BLOCK_BYTES, remaining))
+        if not block:
+            break
+        remaining -= len(block)
+        block = partial + block
+        cut = block.rfind(b'\n') + 1
+        if remaining > 0 and cut:
+            block, partial = block[:cut], block[cut:]
+        elif remaining > 0:
+            partial = block
+            continue
+        else:
+            partial = b''
+        yield [line for line in block.decode().splitlines() if line.strip()]
+
+
+def _score_shard(input_path, start, end, columns, chunk_size, part_path):
+    """Score one byte range of the input CSV into a part file, returning the row count"""
+    rows = 0
+    with open(input_path, 'rb') as input_file, open(part_path, 'w', newline='') as part_file:
+        for lines in _iter_line_blocks(input_file, start, end):
+            for offset in range(0, len(lines), chunk_size):
+                chunk = lines[offset:offset + chunk_size]
+                part_file.write(score_lines(chunk, columns))
+                rows += len(chunk)
+    return rows
+
+
+def score_csv_parallel(input_path, output_path, workers, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score a CSV file across a pool of worker processes
+
+    The data rows are split into byte ranges aligned to line boundaries,
+    each range is scored by a worker into its own part file, and the parts
+    are concatenated into output_path in the original order. Each worker
+    holds at most one read block of rows in memory and evaluates it
+    chunk_size rows at a time.
+    """
+    start = time.perf_counter()
+    with open(input_path, 'rb') as input_file:
+        header = input_file.readline().decode()
+        if not header.strip():
+            with open(output_path, 'w'):
+                pass
+            return ScoreSummary(0, time.perf_counter() - start)
+        columns = _column_indices(header)
+        ranges = _shard_offsets(input_file, len(header.encode()), workers * SHARDS_PER_WORKER)
+
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    with tempfile.TemporaryDirectory(dir=output_dir) as part_dir:
+        part_paths = [os.path.join(part_dir, f'part-{index:05d}.csv') for index in range(len(ranges))]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = pool.map(
+                _score_shard,
+                [input_path] * len(ranges),
+                [begin for begin, _ in ranges],
+                [end for _, end in ranges],
+                [columns] * len(ranges),
+                [chunk_size] * len(ranges),
+                part_paths,
+            )
+            rows = sum(counts)
+        with open(output_path, 'wb') as output_file:
+            output_file.write((header.rstrip('\r\n') + ',' + ','.join(RESULT_COLUMNS) + '\n').encode())
+            for part_path in part_paths:
+                with open(part_path, 'rb') as part_file:
+                    shutil.copyfileobj(part_file, output_file)
+    return ScoreSummary(rows, time.perf_counter() - start)
+
+
+_raw_decode = json.JSONDecoder().raw_decode
+
+
+def _decode_line(number, line):
+    """Decode one JSON Lines line, raising ValueError unless it holds exactly one object"""
+    try:
+        record = json.loads(line)
+    except ValueError as error:
+        raise ValueError(f"Line {number} of the batch is not a single JSON object: {error}") from None
+    if type(record) is not dict:
+        raise ValueError(f"Line {number} of the batch is not a JSON object: {line.strip()[:80]}")
+    return record
+
+
+def _scenario_column(records, column):
+    """Return one input field of every record as floats, raising ValueError naming a bad line"""
+    try:
+        return np.array([record[column] for record in records], dtype=np.float64)
+    except (KeyError, TypeError, ValueError):
+        for number, record in enumerate(records, 1):
+            if column not in record:
+                raise ValueError(f"Line {number} of the batch is missing field '{column}'") from None
+            try:
+                float(record[column])
+            except (TypeError, ValueError):
+                raise ValueError(f"Line {number} of the batch has a non-numeric {column}") from None
+        raise
+
+
+def _check_rows(mask, message):
+    """Raise ValueError naming the first line where mask is False"""
+    if not mask.all():
+        raise ValueError(f"Line {np.flatnonzero(~mask)[0] + 1} of the batch {message}")
+
+
+def score_json_lines(lines):
+    """Score a list of JSON Lines scenario objects, returning the output text
+
+    Each output object is the input object with the four result fields
+    added, in input order. A line that is not exactly one JSON object, or
+    whose fields are not finite numbers with whole non-negative years,
+    raises ValueError naming it, as does a scenario whose results
+    overflow.
+    """
+    # Each line must hold exactly one object, as the results are spliced in before its closing brace
+    try:
+        decoded = [_raw_decode(line) for line in lines]
+    except ValueError:
+        decoded = None
+    if decoded is None or not all(
+            type(record) is dict and not line[end:].strip() for (record, end), line in zip(decoded, lines)):
+        # Slow path: find the offending line, or accept leading whitespace that raw_decode does not
+        records = [_decode_line(number, line) for number, line in enumerate(lines, 1)]
+    else:
+        records = [record for record, _ in decoded]
+    columns = {column: _scenario_column(records, column) for column in INPUT_COLUMNS}
+    _check_rows(np.isfinite(np.array(list(columns.values()))).all(axis=0), "has a field that is not a finite number")
+    years = columns['years']
+    _check_rows((years >= 0) & (years == np.floor(years)), "must have a whole, non-negative number of years")
+    with np.errstate(over='ignore', invalid='ignore'):
+        result = evaluate_batch(
+            columns['initial_value'], columns['fee_percentage'], years, columns['annual_return']
+        )
+    _check_rows(np.isfinite(np.array(result)).all(axis=0), "has results too large to represent")
+    # Splice the results into the original text instead of re-encoding every object
+    prefixes = [line.rstrip()[:-1] for line in lines]
+    # total_fees_paid and opportunity_cost are equal, so format the value once
+    fees = map(repr, result.total_fees_paid.tolist())
+    return ''.join(map(
+        _JSON_SUFFIX_FORMAT, prefixes,
+        result.future_value_no_fees.tolist(), result.future_value_with_fees.tolist(), fees
+    ))
+
+
+def stream_jsonl(input_file, output_file, batch_size=DEFAULT_MICRO_BATCH):
+    """Score JSON Lines scenarios from input_file to output_file in micro-batches
+
+    Up to batch_size records are evaluated together and written, then the
+    output is flushed so downstream pipeline stages see results as soon as
+    each micro-batch completes. Memory is bounded by batch_size.
+    """
+    start = time.perf_counter()
+    rows = 0
+    while True:
+        chunk = list(islice(input_file, batch_size))
+        if not chunk:
+            break
+        lines = [line for line in chunk if line.strip()]
+        if lines:
+            output_file.write(score_json_lines(lines))
+            output_file.flush()
+            rows += len(lines)
+    return ScoreSummary(rows, time.perf_counter() - start)
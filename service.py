@@ -0,0 +1,424 @@
+"""Local asyncio HTTP service exposing the calculator
+
+Endpoints (JSON bodies, rates as fractions):
+
+    POST /calculate        {"initialValue", "feePercentage", "annualReturn", "years"}
+    POST /calculate/batch  {"scenarios": [scenario, ...]}
+    POST /montecarlo       scenario plus optional "volatility", "distribution",
+                           "degreesOfFreedom", "paths" and "seed"
+    GET  /stats            service counters as JSON
+    GET  /metrics          Prometheus text-format metrics
+
+Both calculation endpoints answer with the InvestmentModel fields used by
+the web page, camelCased as ASP.NET serializes them; /montecarlo answers
+with the camelCased MonteCarloResult fields, annualReturn being the mean
+return. Identical scenarios and identical Monte Carlo requests (same
+scenario, distribution, paths and seed) already in flight share one
+computation, and distinct single requests arriving within a short window
+are coalesced into one vectorized evaluation. An optional ResultCache
+answers repeated scenarios without evaluating them at all. Request bodies
+larger than MAX_BODY_BYTES are refused with 413 without being read.
+"""
+import asyncio
+import json
+import math
+import time
+
+import numpy as np
+
+from calculator import ENGINE_CLOSED_FORM
+from metrics import DEFAULT_SIZE_BUCKETS, Registry
+from montecarlo import DEFAULT_PATHS, DISTRIBUTIONS, ReturnDistribution, simulate, validate_distribution
+from vectorized import fee_ledger
+
+
+INPUT_FIELDS = ('initialValue', 'feePercentage', 'annualReturn', 'years')
+RESULT_FIELDS = (
+    'futureValueNoFees', 'portfolioValueWithFees', 'simpleFeesPaid',
+    'compoundLoss', 'extraCompoundEffect', 'totalAdvisorCost',
+)
+DEFAULT_WINDOW = 0.002
+DEFAULT_MAX_BATCH = 4096
+DEFAULT_VOLATILITY = 0.15
+MAX_MONTE_CARLO_PATHS = 1_000_000
+MAX_BODY_BYTES = 8 * 2 ** 20
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Content Too Large', 500: 'Internal Server Error'}
+_PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestError(Exception):
+    """A client error that is reported back with its HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_scenario(payload):
+    """Validate one scenario object and return its fields as a tuple in INPUT_FIELDS order"""
+    if not isinstance(payload, dict):
+        raise RequestError(400, "Scenario must be a JSON object")
+    try:
+        scenario = tuple(float(payload[field]) for field in INPUT_FIELDS)
+    except KeyError as error:
+        raise RequestError(400, f"Scenario is missing field {error}") from None
+    except (TypeError, ValueError):
+        raise RequestError(400, f"Scenario fields {', '.join(INPUT_FIELDS)} must be numbers") from None
+    if not all(math.isfinite(value) for value in scenario):
+        raise RequestError(400, f"Scenario fields {', '.join(INPUT_FIELDS)} must be finite")
+    years = scenario[-1]
+    if years < 0 or years != int(years):
+        raise RequestError(400, f"Scenario years must be a non-negative whole number, got {years:g}")
+    return scenario
+
+
+def parse_monte_carlo(payload):
+    """Validate a Monte Carlo request and return (scenario, distribution, paths, seed)"""
+    scenario = parse_scenario(payload)
+    kind = payload.get('distribution', DISTRIBUTIONS[0])
+    paths = payload.get('paths', DEFAULT_PATHS)
+    seed = payload.get('seed')
+    if type(paths) is not int or not 2 <= paths <= MAX_MONTE_CARLO_PATHS:
+        raise RequestError(400, f"paths must be a whole number from 2 to {MAX_MONTE_CARLO_PATHS:,}")
+    if seed is not None and (type(seed) is not int or seed < 0):
+        raise RequestError(400, "seed must be a non-negative whole number")
+    try:
+        volatility = float(payload.get('volatility', DEFAULT_VOLATILITY))
+        degrees_of_freedom = payload.get('degreesOfFreedom')
+        if degrees_of_freedom is not None:
+            degrees_of_freedom = float(degrees_of_freedom)
+        distribution = ReturnDistribution(kind, scenario[2], volatility, degrees_of_freedom)
+        validate_distribution(distribution)
+    except (TypeError, ValueError) as error:
+        raise RequestError(400, f"Invalid return distribution: {error}") from None
+    if not all(math.isfinite(value) for value in (volatility, degrees_of_freedom or 0)):
+        raise RequestError(400, "volatility and degreesOfFreedom must be finite")
+    return scenario, distribution, paths, seed
+
+
+def _camel_case(name):
+    """Return a snake_case field name camelCased"""
+    first, *rest = name.split('_')
+    return first + ''.join(part.title() for part in rest)
+
+
+def evaluate_scenarios(scenarios):
+    """Evaluate a list of scenario tuples in one vectorized pass, returning result dicts"""
+    initial_value, fee_percentage, annual_return, years = zip(*scenarios)
+    # An overflowing scenario is answered with a 400 when its result is serialized
+    with np.errstate(over='ignore', invalid='ignore'):
+        ledger = fee_ledger(initial_value, fee_percentage, years, annual_return)
+    columns = [field.tolist() for field in ledger]
+    return [dict(zip(RESULT_FIELDS, values)) for values in zip(*columns)]
+
+
+class MicroBatcher:
+    """Coalesce scenarios submitted within a short window into one evaluation
+
+    The first submission after an idle period opens a window of `window`
+    seconds; everything submitted before it closes (or until max_batch
+    scenarios are waiting) is evaluated together.
+    """
+
+    def __init__(self, evaluate=evaluate_scenarios, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self.evaluate = evaluate
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+
+    @property
+    def queue_depth(self):
+        """Number of scenarios waiting for the current window to close"""
+        return len(self._pending)
+
+    def submit(self, scenario):
+        """Queue a scenario and return a future for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((scenario, future))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        return future
+
+    def flush(self):
+        """Evaluate every waiting scenario now"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        scenarios = [scenario for scenario, _ in pending]
+        try:
+            results = self.evaluate(scenarios)
+        except Exception as error:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class SingleFlight:
+    """Share one in-flight computation between concurrent callers with the same key"""
+
+    def __init__(self):
+        self._in_flight = {}
+        self.requests = 0
+        self.collapsed = 0
+
+    async def run(self, key, start):
+        """Await start() for key, or join the computation already running for it"""
+        self.requests += 1
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(start())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.collapsed += 1
+        # A cancelled caller must not cancel the computation the others share
+        return await asyncio.shield(future)
+
+    def stats(self):
+        """Return the request and collapse counters"""
+        return {'requests': self.requests, 'collapsed': self.collapsed, 'inFlight': len(self._in_flight)}
+
+
+class ServiceMetrics:
+    """Metric families describing one CalculationService"""
+
+    def __init__(self, service):
+        registry = self.registry = Registry()
+        self.requests = registry.counter(
+            'calculator_requests_total', "HTTP requests served", ('endpoint', 'status'))
+        self.request_seconds = registry.histogram(
+            'calculator_request_duration_seconds', "HTTP request latency", ('endpoint',))
+        self.engine_seconds = registry.histogram(
+            'calculator_engine_duration_seconds', "Time spent in calculation engines", ('engine',))
+        self.batch_size = registry.histogram(
+            'calculator_batch_size', "Scenarios per vectorized evaluation", ('source',), DEFAULT_SIZE_BUCKETS)
+        registry.gauge(
+            'calculator_queue_depth', "Scenarios waiting in the micro-batcher"
+        ).set_function(lambda: service.batcher.queue_depth)
+        registry.counter(
+            'calculator_single_flight_requests_total', "Requests routed through single-flight"
+        ).set_function(lambda: service.single_flight.requests)
+        registry.counter(
+            'calculator_single_flight_collapsed_total', "Requests that joined an identical in-flight computation"
+        ).set_function(lambda: service.single_flight.collapsed)
+        cache_lookups = registry.counter(
+            'calculator_cache_lookups_total', "Result cache lookups by outcome", ('result',))
+        cache_lookups.labels('hit').set_function(lambda: service.cache.hits if service.cache else 0)
+        cache_lookups.labels('miss').set_function(lambda: service.cache.misses if service.cache else 0)
+        registry.gauge(
+            'calculator_cache_hit_ratio', "Fraction of result cache lookups that hit"
+        ).set_function(lambda: service.cache.hit_rate() if service.cache else 0.0)
+        registry.counter(
+            'calculator_cache_evictions_total', "Entries evicted from the result cache"
+        ).set_function(lambda: service.cache.evictions if service.cache else 0)
+
+    def timed_engine(self, engine, source, evaluate):
+        """Wrap an evaluate(scenarios) function to record engine time and batch size"""
+        seconds = self.engine_seconds.labels(engine)
+        sizes = self.batch_size.labels(source)
+
+        def timed(scenarios):
+            start = time.perf_counter()
+            try:
+                return evaluate(scenarios)
+            finally:
+                seconds.observe(time.perf_counter() - start)
+                sizes.observe(len(scenarios))
+
+        return timed
+
+
+class CalculationService:
+    """HTTP front end routing requests to the micro-batcher"""
+
+    def __init__(self, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH, cache=None):
+        self.cache = cache
+        self.single_flight = SingleFlight()
+        self.metrics = ServiceMetrics(self)
+        self.batcher = MicroBatcher(
+            self.metrics.timed_engine(ENGINE_CLOSED_FORM, 'micro_batch', evaluate_scenarios), window, max_batch
+        )
+        self._evaluate_batch = self.metrics.timed_engine(ENGINE_CLOSED_FORM, 'batch_endpoint', evaluate_scenarios)
+        self.routes = {
+            '/calculate': ('POST', self.calculate),
+            '/calculate/batch': ('POST', self.calculate_batch),
+            '/montecarlo': ('POST', self.monte_carlo),
+            '/stats': ('GET', self.stats),
+            '/metrics': ('GET', self.render_metrics),
+        }
+        # Resolve labelled children once so recording a request is a plain update
+        self._request_seconds = {path: self.metrics.request_seconds.labels(path) for path in self.routes}
+        self._request_counts = {}
+        self._monte_carlo_seconds = self.metrics.engine_seconds.labels('monte_carlo')
+
+    async def calculate(self, payload):
+        """Evaluate one scenario, sharing any identical computation already in flight"""
+        scenario = parse_scenario(payload)
+        if self.cache is None:
+            return await self.single_flight.run(('calculate', scenario), lambda: self.batcher.submit(scenario))
+        result = self.cache.get(scenario)
+        if result is None:
+            result = await self.single_flight.run(('calculate', scenario), lambda: self.batcher.submit(scenario))
+            self.cache.put(scenario, result)
+        return result
+
+    async def calculate_batch(self, payload):
+        """Evaluate a list of scenarios in one pass"""
+        scenarios = payload.get('scenarios') if isinstance(payload, dict) else None
+        if not isinstance(scenarios, list):
+            raise RequestError(400, "Batch body must be an object with a 'scenarios' list")
+        if not scenarios:
+            return {'results': []}
+        return {'results': self._evaluate_batch([parse_scenario(scenario) for scenario in scenarios])}
+
+    async def monte_carlo(self, payload):
+        """Simulate one scenario, sharing any identical simulation already in flight"""
+        request = parse_monte_carlo(payload)
+        return await self.single_flight.run(('montecarlo', *request), lambda: self._simulate(*request))
+
+    async def _simulate(self, scenario, distribution, paths, seed):
+        """Run a simulation off the event loop and return its camelCased summary"""
+        initial_value, fee_percentage, _, years = scenario
+        start = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(
+                simulate, initial_value, fee_percentage, int(years), distribution, paths, seed
+            )
+        finally:
+            self._monte_carlo_seconds.observe(time.perf_counter() - start)
+        return {_camel_case(field): value for field, value in result._asdict().items()}
+
+    async def stats(self, payload):
+        """Report service counters"""
+        stats = {'singleFlight': self.single_flight.stats(), 'queueDepth': self.batcher.queue_depth}
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()._asdict()
+        return stats
+
+    async def render_metrics(self, payload):
+        """Render every metric in Prometheus text format"""
+        return self.metrics.registry.render()
+
+    async def dispatch(self, method, path, body):
+        """Route one request, returning (status, payload) with a successful JSON payload already encoded"""
+        start = time.perf_counter()
+        status, payload = await self._dispatch(method, path, body)
+        endpoint = path if path in self.routes else 'other'
+        counter = self._request_counts.get((endpoint, status))
+        if counter is None:
+            counter = self._request_counts[endpoint, status] = self.metrics.requests.labels(endpoint, status)
+        counter.inc()
+        if endpoint in self._request_seconds:
+            self._request_seconds[endpoint].observe(time.perf_counter() - start)
+        return status, payload
+
+    async def _dispatch(self, method, path, body):
+        """Route one request to its handler"""
+        route = self.routes.get(path)
+        if route is None:
+            return 404, {'error': f"No such endpoint {path}"}
+        allowed, handler = route
+        if method != allowed:
+            return 405, {'error': f"Use {allowed}"}
+        try:
+            payload = json.loads(body or b'null')
+        except ValueError:
+            return 400, {'error': "Body is not valid JSON"}
+        try:
+            result = await handler(payload)
+        except RequestError as error:
+            return error.status, {'error': str(error)}
+        except Exception:
+            # Answer rather than drop the connection; the client can retry
+            return 500, {'error': "Internal server error"}
+        if isinstance(result, str):
+            return 200, result
+        try:
+            return 200, json.dumps(result, allow_nan=False).encode()
+        except ValueError:
+            return 400, {'error': "Scenario result overflows a JSON number"}
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection, honouring keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    await self._respond(writer, 400, {'error': "Malformed request line"}, keep_alive=False)
+                    break
+                method, path, version = parts
+                length = headers.get('content-length', '0') or '0'
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(writer, 400, {'error': "Malformed Content-Length"}, keep_alive=False)
+                    break
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    # Refuse before reading so an oversized body is never buffered
+                    await self._respond(writer, 413, {'error': f"Request body exceeds {MAX_BODY_BYTES:,} bytes"},
+                                        keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await self.dispatch(method, path, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        """Write a JSON response, already encoded or not, or a metrics page when payload is text"""
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), _PROMETHEUS_CONTENT_TYPE
+        elif isinstance(payload, bytes):
+            body, content_type = payload, 'application/json'
+        else:
+            body, content_type = json.dumps(payload, allow_nan=False).encode(), 'application/json'
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=8080, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH,
+                cache=None, ready=None):
+    """Run the calculation service until cancelled
+
+    If ready is an asyncio.Future it is resolved with the bound (host, port)
+    once the server is listening, which is useful with port=0.
+    """
+    service = CalculationService(window=window, max_batch=max_batch, cache=cache)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    if ready is not None:
+        ready.set_result(server.sockets[0].getsockname()[:2])
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,51 @@
+import unittest
+
+from benchmarks.differential import EDGE_CASES, run, sample_parameters
+from benchmarks.suite import compare, measure
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """Unit tests for benchmark timing and baseline comparison"""
+
+    def test_compare_flags_only_regressions_beyond_threshold(self):
+        """Test that slower cases past the threshold are reported"""
+        baseline = {'results': [
+            {'name': 'a', 'seconds_per_call': 1.0},
+            {'name': 'b', 'seconds_per_call': 1.0},
+            {'name': 'c', 'seconds_per_call': 1.0},
+        ]}
+        results = [
+            {'name': 'a', 'seconds_per_call': 1.05},
+            {'name': 'b', 'seconds_per_call': 1.5},
+            {'name': 'c', 'seconds_per_call': 0.5},
+            {'name': 'new', 'seconds_per_call': 9.0},
+        ]
+        regressions = compare(results, baseline, threshold=0.10)
+        self.assertEqual([name for name, *_ in regressions], ['b'])
+        self.assertAlmostEqual(regressions[0][3], 0.5)
+
+    def test_measure_returns_positive_time(self):
+        """Test that measure() times a trivial function"""
+        self.assertGreater(measure(lambda: sum(range(10)), min_time=0.01), 0)
+
+
+class TestDifferential(unittest.TestCase):
+    """Unit tests for the fast-engine accuracy harness"""
+
+    def test_samples_include_edge_cases(self):
+        """Test that the edge cases lead every sample"""
+        initial_value, fee_percentage, years, annual_return = sample_parameters(100)
+        self.assertEqual(initial_value.size, 100)
+        self.assertEqual(list(zip(initial_value, fee_percentage, years, annual_return))[:len(EDGE_CASES)],
+                         [tuple(float(value) for value in case) for case in EDGE_CASES])
+
+    def test_fast_engines_match_reference_loop(self):
+        """Test that every fast engine agrees with the year-by-year loop"""
+        reports = run(samples=2000, scalar_samples=200)
+        for report in reports[1:]:
+            self.assertLess(report['value_max_rel_error'], 1e-9, report['engine'])
+            self.assertLess(report['fees_max_rel_error'], 1e-9, report['engine'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+import calculator
+from cache import ResultCache
+from calculator import InvestmentCalculator
+
+
+class TestResultCache(unittest.TestCase):
+    """Unit tests for the bounded result cache"""
+
+    def test_hits_and_misses(self):
+        """Test that repeated keys are served from the cache"""
+        cache = ResultCache(capacity=4)
+        calls = []
+        for key in ['a', 'b', 'a', 'a']:
+            cache.get_or_compute(key, lambda: calls.append(key) or len(calls))
+        stats = cache.stats()
+        self.assertEqual(calls, ['a', 'b'])
+        self.assertEqual((stats.hits, stats.misses, stats.size), (2, 2, 2))
+        self.assertAlmostEqual(cache.hit_rate(), 0.5)
+        self.assertGreater(stats.memory_bytes, 0)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        cache = ResultCache(capacity=2)
+        cache.get_or_compute('a', lambda: 1)
+        cache.get_or_compute('b', lambda: 2)
+        cache.get_or_compute('a', lambda: 1)
+        cache.get_or_compute('c', lambda: 3)
+        self.assertEqual(cache.stats().evictions, 1)
+        cache.get_or_compute('a', lambda: 1)
+        self.assertEqual(cache.stats().misses, 3)
+
+    def test_fifo_eviction(self):
+        """Test that FIFO evicts the oldest entry even if recently used"""
+        cache = ResultCache(capacity=2, policy='fifo')
+        cache.get_or_compute('a', lambda: 1)
+        cache.get_or_compute('b', lambda: 2)
+        cache.get_or_compute('a', lambda: 1)
+        cache.get_or_compute('c', lambda: 3)
+        cache.get_or_compute('a', lambda: 1)
+        self.assertEqual(cache.stats().misses, 4)
+
+    def test_invalid_configuration(self):
+        """Test that bad capacities and policies are rejected"""
+        with self.assertRaises(ValueError):
+            ResultCache(capacity=0)
+        with self.assertRaises(ValueError):
+            ResultCache(policy='random')
+
+
+class TestCalculatorResultCache(unittest.TestCase):
+    """Unit tests for the process-wide calculator cache"""
+
+    def tearDown(self):
+        """Restore the default uncached behaviour"""
+        calculator.disable_result_cache()
+
+    def test_shared_between_instances(self):
+        """Test that identical scenarios share one evaluation"""
+        cache = calculator.enable_result_cache(capacity=8)
+        first = InvestmentCalculator(1_000_000, 0.01, 30, 0.07).compute()
+        second = InvestmentCalculator(1_000_000, 0.01, 30, 0.07).compute()
+        self.assertIs(first, second)
+        self.assertEqual(cache.stats().hits, 1)
+
+    def test_quantized_inputs(self):
+        """Test that quantization maps near-identical inputs to one entry"""
+        cache = calculator.enable_result_cache(capacity=8, quantize=True)
+        first = InvestmentCalculator(1_000_000.001, 0.010000001, 30, 0.07).total_fees_paid()
+        second = InvestmentCalculator(1_000_000, 0.01, 30, 0.07).total_fees_paid()
+        self.assertEqual(first, second)
+        self.assertEqual(cache.stats().hits, 1)
+
+    def test_disabled_by_default(self):
+        """Test that no cache is used unless enabled"""
+        self.assertIsNone(calculator.get_result_cache())
+
+
+if __name__ == '__main__':
+    unittest.main()
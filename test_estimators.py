@@ -0,0 +1,100 @@
+import unittest
+import math
+
+import numpy as np
+
+from estimators import RunningCovariance, RunningMoments, TDigest
+
+
+class TestRunningMoments(unittest.TestCase):
+    """Unit tests for the streaming mean and variance"""
+
+    def test_batches_match_numpy(self):
+        """Test that batched updates and merges agree with a single pass"""
+        values = np.random.default_rng(0).normal(1e6, 1e3, 10_001)
+        moments = RunningMoments()
+        for batch in np.array_split(values, 7):
+            part = RunningMoments()
+            part.update(batch)
+            moments.merge(part)
+        self.assertEqual(moments.count, values.size)
+        self.assertTrue(math.isclose(moments.mean, values.mean(), rel_tol=1e-14))
+        self.assertTrue(math.isclose(moments.variance, values.var(ddof=1), rel_tol=1e-10))
+
+    def test_variance_needs_two_values(self):
+        """Test that the variance of fewer than two values is undefined"""
+        moments = RunningMoments()
+        moments.update([3.0])
+        self.assertEqual(moments.mean, 3.0)
+        self.assertTrue(math.isnan(moments.variance))
+
+
+class TestRunningCovariance(unittest.TestCase):
+    """Unit tests for the streaming covariance"""
+
+    def test_batches_match_numpy(self):
+        """Test that merged batches agree with numpy's covariance matrix"""
+        rng = np.random.default_rng(2)
+        x = rng.normal(5e5, 1e4, 9_999)
+        y = 3 * x + rng.normal(0, 1e3, x.size)
+        covariance = RunningCovariance()
+        for batch_x, batch_y in zip(np.array_split(x, 4), np.array_split(y, 4)):
+            part = RunningCovariance()
+            part.update(batch_x, batch_y)
+            covariance.merge(part)
+        expected = np.cov(x, y)
+        self.assertTrue(math.isclose(covariance.mean_y, y.mean(), rel_tol=1e-14))
+        self.assertTrue(math.isclose(covariance.variance_x, expected[0, 0], rel_tol=1e-10))
+        self.assertTrue(math.isclose(covariance.variance_y, expected[1, 1], rel_tol=1e-10))
+        self.assertTrue(math.isclose(covariance.covariance, expected[0, 1], rel_tol=1e-10))
+
+
+class TestTDigest(unittest.TestCase):
+    """Unit tests for the streaming quantile estimator"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.values = np.random.default_rng(1).lognormal(0, 0.8, 200_000)
+        self.digest = TDigest()
+        for batch in np.array_split(self.values, 13):
+            self.digest.update(batch)
+
+    def test_percentiles_close_to_exact(self):
+        """Test that percentiles are within a small relative error"""
+        percentiles = [1, 5, 25, 50, 75, 95, 99]
+        estimate = self.digest.percentile(percentiles)
+        exact = np.percentile(self.values, percentiles)
+        np.testing.assert_allclose(estimate, exact, rtol=2e-3)
+        self.assertEqual(self.digest.quantile(0), self.values.min())
+        self.assertEqual(self.digest.quantile(1), self.values.max())
+
+    def test_size_is_bounded(self):
+        """Test that the centroid count stays near compression / 2"""
+        self.assertEqual(self.digest.count, self.values.size)
+        self.assertLessEqual(self.digest.means.size, self.digest.compression // 2 + 1)
+
+    def test_merge_matches_single_digest(self):
+        """Test that merged digests estimate like one fed every value"""
+        merged = TDigest()
+        for batch in np.array_split(self.values, 5):
+            part = TDigest()
+            part.update(batch)
+            merged.merge(part)
+        np.testing.assert_allclose(merged.percentile([5, 50, 95]), self.digest.percentile([5, 50, 95]), rtol=2e-3)
+
+    def test_tail_mean(self):
+        """Test that the lower and upper tail means match the sorted values"""
+        ordered = np.sort(self.values)
+        tail = self.values.size // 20
+        self.assertTrue(math.isclose(self.digest.tail_mean(0.05), ordered[:tail].mean(), rel_tol=1e-3))
+        self.assertTrue(math.isclose(self.digest.tail_mean(0.05, upper=True), ordered[-tail:].mean(), rel_tol=1e-3))
+        self.assertTrue(math.isclose(self.digest.tail_mean(1), self.values.mean(), rel_tol=1e-12))
+
+    def test_empty_digest(self):
+        """Test that an empty digest refuses to estimate"""
+        with self.assertRaises(ValueError):
+            TDigest().quantile(0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,34 +1,12 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
 import unittest
 import math
 
-
-class InvestmentCalculator:
-    """Helper class to encapsulate investment calculations"""
-    
-    def __init__(self, initial_value, fee_percentage, years, annual_return):
-        self.initial_value = initial_value
-        self.fee_percentage = fee_percentage
-        self.years = years
-        self.annual_return = annual_return
-    
-    def future_value_no_fees(self):
-        """Calculate portfolio value without fees (just compounding growth)"""
-        return self.initial_value * (1 + self.annual_return) ** self.years
-    
-    def future_value_with_fees(self):
-        """Calculate portfolio value with annual fees deducted"""
-        portfolio_value = self.initial_value
-        for year in range(self.years):
-            portfolio_value *= (1 + self.annual_return - self.fee_percentage)
-        return portfolio_value
-    
-    def total_fees_paid(self):
-        """Calculate total fees paid"""
-        return self.future_value_no_fees() - self.future_value_with_fees()
-    
-    def opportunity_cost(self):
-        """Calculate opportunity cost (same as total fees paid)"""
-        return self.future_value_no_fees() - self.future_value_with_fees()
+from calculator import InvestmentCalculator, Scenario
 
 
 class TestInvestmentCalculator(unittest.TestCase):
@@ -213,6 +191,157 @@ class TestInvestmentCalculator(unittest.TestCase):
         calc_high_fee = InvestmentCalculator(1_000_000, 0.01, 20, 0.05)
         self.assertLess(fees, calc_high_fee.total_fees_paid())
 
+    def test_closed_form_matches_loop(self):
+        """Test that the closed-form engine agrees with the reference loop"""
+        scenarios = [
+            (2_000_000, 0.01, 15, 0.05),
+            (1_000_000, 0.0001, 60, 0.05),
+            (1_000_000, 0.01, 5, -0.05),
+            (1_000_000, 0.01, 10, 0),
+            (1_000_000, 0.01, 0, 0.05),
+            (250_000, 0.02, 40, 0.10),
+        ]
+        for params in scenarios:
+            fast = InvestmentCalculator(*params)
+            reference = InvestmentCalculator(*params, engine='loop')
+            for method in ('future_value_no_fees', 'future_value_with_fees', 'total_fees_paid'):
+                expected = getattr(reference, method)()
+                actual = getattr(fast, method)()
+                self.assertTrue(
+                    math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-6),
+                    f"{method}{params}: {actual} != {expected}"
+                )
+
+    def test_total_fees_small_fee_precision(self):
+        """Test that tiny fees over long horizons keep full relative precision"""
+        calc = InvestmentCalculator(1_000_000, 1e-12, 60, 0.05)
+        # First-order expansion: P * n * f * (1 + r) ** (n - 1)
+        expected = 1_000_000 * 60 * 1e-12 * 1.05 ** 59
+        self.assertAlmostEqual(calc.total_fees_paid() / expected, 1, places=6)
+
+    def test_compute_returns_all_figures(self):
+        """Test that compute() returns the same figures as the individual methods"""
+        calc = InvestmentCalculator(**self.default_params)
+        result = calc.compute()
+        self.assertEqual(result.future_value_no_fees, calc.future_value_no_fees())
+        self.assertEqual(result.future_value_with_fees, calc.future_value_with_fees())
+        self.assertEqual(result.total_fees_paid, calc.total_fees_paid())
+        self.assertEqual(result.opportunity_cost, calc.opportunity_cost())
+        self.assertIs(calc.compute(), result)
+
+    def test_compute_invalidated_on_parameter_change(self):
+        """Test that changing a parameter discards the cached result"""
+        calc = InvestmentCalculator(**self.default_params)
+        before = calc.future_value_with_fees()
+        calc.years = 30
+        after = calc.future_value_with_fees()
+        self.assertGreater(after, before)
+        expected = InvestmentCalculator(2_000_000, 0.01, 30, 0.05).future_value_with_fees()
+        self.assertAlmostEqual(after, expected, places=6)
+
+    def test_scenario_record_is_immutable_and_hashable(self):
+        """Test that the calculator consumes an immutable, hashable Scenario"""
+        scenario = Scenario(**self.default_params)
+        with self.assertRaises(AttributeError):
+            scenario.years = 30
+        self.assertEqual(hash(scenario), hash(Scenario(**self.default_params)))
+        calc = InvestmentCalculator.from_scenario(scenario)
+        self.assertIs(calc.scenario, scenario)
+        self.assertEqual(calc.years, 15)
+        self.assertAlmostEqual(
+            calc.future_value_with_fees(),
+            InvestmentCalculator(**self.default_params).future_value_with_fees(),
+            places=10
+        )
+
+    def test_calculator_has_no_instance_dict(self):
+        """Test that calculator instances are slotted"""
+        calc = InvestmentCalculator(**self.default_params)
+        self.assertFalse(hasattr(calc, '__dict__'))
+
+    def test_reassignment_discards_cached_result(self):
+        """Test that changing the scenario or engine recomputes the figures"""
+        calc = InvestmentCalculator(**self.default_params)
+        closed_form = calc.compute()
+        calc.engine = 'loop'
+        self.assertIsNot(calc.compute(), closed_form)
+        self.assertAlmostEqual(calc.future_value_with_fees(), closed_form.future_value_with_fees, places=6)
+        calc.scenario = Scenario(1_000_000, 0.01, 30, 0.05)
+        self.assertEqual(calc.years, 30)
+        self.assertAlmostEqual(
+            calc.future_value_with_fees(),
+            InvestmentCalculator(1_000_000, 0.01, 30, 0.05).future_value_with_fees(),
+            places=6
+        )
+        with self.assertRaises(ValueError):
+            calc.engine = 'bogus'
+
+    def test_trajectory_matches_terminal_values(self):
+        """Test that the last trajectory year matches the terminal figures"""
+        calc = InvestmentCalculator(1_000_000, 0.01, 30, 0.07)
+        path = calc.trajectory()
+        self.assertEqual([record.year for record in path], list(range(1, 31)))
+        last = path[-1]
+        self.assertAlmostEqual(last.balance_no_fees, calc.future_value_no_fees(), places=4)
+        self.assertAlmostEqual(last.balance_with_fees, calc.future_value_with_fees(), places=4)
+        fees_charged = sum(record.fee_charged for record in path)
+        self.assertAlmostEqual(fees_charged + last.cumulative_lost_growth, calc.total_fees_paid(), places=4)
+
+    def test_trajectory_first_year(self):
+        """Test the first year's fee and balances"""
+        calc = InvestmentCalculator(1_000_000, 0.01, 10, 0.05)
+        first = next(calc.iter_trajectory())
+        self.assertAlmostEqual(first.fee_charged, 10_000, places=6)
+        self.assertAlmostEqual(first.balance_no_fees, 1_050_000, places=6)
+        self.assertAlmostEqual(first.balance_with_fees, 1_040_000, places=6)
+        self.assertAlmostEqual(first.cumulative_lost_growth, 0, places=6)
+
+    def test_trajectory_zero_years(self):
+        """Test that a zero-year horizon yields no records"""
+        calc = InvestmentCalculator(1_000_000, 0.01, 0, 0.05)
+        self.assertEqual(calc.trajectory(), [])
+
+    def test_unknown_engine(self):
+        """Test that an unknown engine name is rejected"""
+        with self.assertRaises(ValueError):
+            InvestmentCalculator(1_000_000, 0.01, 10, 0.05, engine='bogus')
+
+
+class TestCommandLine(unittest.TestCase):
+    """Unit tests for the investments.py entry point"""
+
+    def test_import_has_no_side_effects(self):
+        """Test that importing the module prints nothing and skips NumPy"""
+        probe = "import sys, investments; print('numpy' in sys.modules)"
+        output = subprocess.run(
+            [sys.executable, '-c', probe], check=True, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        self.assertEqual(output.stdout, 'False\n')
+
+    def test_main_reports_requested_scenario(self):
+        """Test that the flags select the scenario that is reported"""
+        import investments
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            investments.main(['--initial-value', '1000000', '--fee-percentage', '0.01',
+                              '--years', '30', '--annual-return', '0.07'])
+        fees = InvestmentCalculator(1_000_000, 0.01, 30, 0.07).total_fees_paid()
+        self.assertIn(f"Total fees paid: ${fees:,.2f}", stdout.getvalue())
+
+    def test_montecarlo_modes_are_exclusive(self):
+        """Test that options which the chosen Monte Carlo mode would ignore are rejected"""
+        import investments
+
+        for options in (['--compare-fees', '0.01', '0.02', '--expected-fees'], ['--expected-fees', '--streaming'],
+                        ['--compare-fees', '0.01', '--streaming'], ['--expected-fees', '--memory-budget', '64'],
+                        ['--memory-budget', '64', '--compare-fees', '0.01']):
+            with self.subTest(options=options):
+                with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as caught:
+                    investments.main(['montecarlo', '--paths', '100'] + options)
+                self.assertEqual(caught.exception.code, 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from metrics import Registry
+
+
+class TestRegistry(unittest.TestCase):
+    """Unit tests for Prometheus text rendering"""
+
+    def test_counter_with_labels(self):
+        """Test that labelled counters render one sample per label set"""
+        registry = Registry()
+        requests = registry.counter('requests_total', "Requests", ('endpoint',))
+        requests.labels('/a').inc()
+        requests.labels('/a').inc(2)
+        requests.labels('/b').inc()
+        text = registry.render()
+        self.assertIn('# TYPE requests_total counter', text)
+        self.assertIn('requests_total{endpoint="/a"} 3', text)
+        self.assertIn('requests_total{endpoint="/b"} 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that histogram buckets, sum and count follow the exposition format"""
+        registry = Registry()
+        latency = registry.histogram('latency_seconds', "Latency", buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            latency.observe(value)
+        lines = registry.render().splitlines()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2', lines)
+        self.assertIn('latency_seconds_bucket{le="1"} 3', lines)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_sum 3.65', lines)
+        self.assertIn('latency_seconds_count 4', lines)
+
+    def test_gauge_function(self):
+        """Test that function-backed gauges are read at render time"""
+        registry = Registry()
+        depth = [0]
+        registry.gauge('queue_depth', "Depth").set_function(lambda: depth[0])
+        depth[0] = 7
+        self.assertIn('queue_depth 7', registry.render())
+
+    def test_label_count_checked(self):
+        """Test that the wrong number of label values is rejected"""
+        registry = Registry()
+        requests = registry.counter('requests_total', "Requests", ('endpoint', 'status'))
+        with self.assertRaises(ValueError):
+            requests.labels('/a')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,244 @@
+import unittest
+import math
+import tracemalloc
+
+import numpy as np
+
+from calculator import InvestmentCalculator
+from montecarlo import (
+    DEFAULT_COMPRESSION, DISTRIBUTIONS, STREAMING_BYTES_PER_COMPRESSION, STREAMING_BYTES_PER_PATH,
+    STREAMING_FIXED_BYTES, ReturnDistribution, block_seeds, chunk_paths_for_budget, compare_fees,
+    draw_growth, estimate_fee_cost, mirror_growth, peak_rss, shared_paths, simulate, simulate_paths,
+    simulate_streaming,
+)
+
+
+class TestMonteCarlo(unittest.TestCase):
+    """Unit tests for the Monte Carlo engine"""
+
+    def test_zero_volatility_matches_calculator(self):
+        """Test that every path equals the deterministic answer without randomness"""
+        result = simulate(1_000_000, 0.01, 30, ReturnDistribution('normal', 0.07, 0.0), paths=100, seed=1)
+        calc = InvestmentCalculator(1_000_000, 0.01, 30, 0.07)
+        for band in (result.wealth_with_fees, result.fee_cost):
+            self.assertEqual(len(set(band.values())), 1)
+        self.assertTrue(math.isclose(result.wealth_with_fees[50], calc.future_value_with_fees(), rel_tol=1e-12))
+        self.assertTrue(math.isclose(result.fee_cost[50], calc.total_fees_paid(), rel_tol=1e-12))
+
+    def test_same_seed_is_reproducible(self):
+        """Test that a seed fixes the result, including across block boundaries"""
+        first = simulate(1_000_000, 0.01, 10, paths=1000, seed=7, block_paths=128)
+        second = simulate(1_000_000, 0.01, 10, paths=1000, seed=7, block_paths=128)
+        self.assertEqual(first, second)
+
+    def test_results_independent_of_worker_count(self):
+        """Test that worker processes reproduce a single-process run bit for bit"""
+        distribution = ReturnDistribution('student_t', 0.07, 0.15, 5)
+        serial = simulate_paths(1_000_000, 0.01, 10, distribution, 1000, seed=11, block_paths=128)
+        parallel = simulate_paths(1_000_000, 0.01, 10, distribution, 1000, seed=11, workers=3, block_paths=128)
+        for expected, actual in zip(serial, parallel):
+            np.testing.assert_array_equal(actual, expected)
+
+    def test_shared_memory_matches_pickled_results(self):
+        """Test that workers writing into shared memory produce the same balances"""
+        distribution = ReturnDistribution('lognormal', 0.07, 0.15)
+        expected = simulate_paths(1_000_000, 0.01, 10, distribution, 1000, seed=4, block_paths=128)
+        with shared_paths(1_000_000, 0.01, 10, distribution, 1000, seed=4, workers=2, block_paths=128) as actual:
+            for expected_balances, actual_balances in zip(expected, actual):
+                np.testing.assert_array_equal(actual_balances, expected_balances)
+        self.assertEqual(
+            simulate(1_000_000, 0.01, 10, paths=1000, seed=4, workers=2, transport='shared_memory'),
+            simulate(1_000_000, 0.01, 10, paths=1000, seed=4, workers=2, transport='pickle'),
+        )
+
+    def test_streaming_matches_exact_summary(self):
+        """Test that the constant-memory summary agrees with keeping every path"""
+        distribution = ReturnDistribution('normal', 0.07, 0.15)
+        exact = simulate(1_000_000, 0.01, 20, distribution, paths=50_000, seed=6, block_paths=4096)
+        streaming = simulate_streaming(1_000_000, 0.01, 20, distribution, paths=50_000, seed=6, block_paths=4096)
+        self.assertEqual(streaming.paths, exact.paths)
+        for field in ('mean_wealth_with_fees', 'mean_fee_cost', 'variance_wealth_with_fees', 'variance_fee_cost'):
+            self.assertTrue(math.isclose(getattr(streaming, field), getattr(exact, field), rel_tol=1e-10), field)
+        for field in ('wealth_with_fees', 'fee_cost'):
+            for percentile in exact.percentiles:
+                self.assertTrue(math.isclose(getattr(streaming, field)[percentile], getattr(exact, field)[percentile],
+                                             rel_tol=5e-3), f"{field}[{percentile}]")
+        self.assertTrue(math.isclose(streaming.cvar_wealth_with_fees, exact.cvar_wealth_with_fees, rel_tol=5e-3))
+        self.assertTrue(math.isclose(streaming.cvar_fee_cost, exact.cvar_fee_cost, rel_tol=5e-3))
+        self.assertLess(exact.cvar_wealth_with_fees, exact.wealth_with_fees[5])
+
+    def test_streaming_independent_of_worker_count(self):
+        """Test that merging per-block summaries in order makes workers irrelevant"""
+        serial = simulate_streaming(1_000_000, 0.01, 10, paths=2000, seed=8, block_paths=256)
+        parallel = simulate_streaming(1_000_000, 0.01, 10, paths=2000, seed=8, workers=2, block_paths=256)
+        self.assertEqual(serial, parallel)
+
+    def test_memory_budget_does_not_change_paths(self):
+        """Test that chunking blocks to fit a budget draws the same paths"""
+        distribution = ReturnDistribution('student_t', 0.07, 0.15, 5)
+        unbounded = simulate_streaming(1_000_000, 0.01, 30, distribution, paths=3000, seed=9, block_paths=1000)
+        budgeted = simulate_streaming(1_000_000, 0.01, 30, distribution, paths=3000, seed=9, block_paths=1000,
+                                      memory_budget=256 * 1024)
+        self.assertTrue(math.isclose(budgeted.mean_fee_cost, unbounded.mean_fee_cost, rel_tol=1e-12))
+        self.assertTrue(math.isclose(budgeted.variance_wealth_with_fees, unbounded.variance_wealth_with_fees,
+                                     rel_tol=1e-10))
+        self.assertTrue(math.isclose(budgeted.wealth_with_fees[50], unbounded.wealth_with_fees[50], rel_tol=5e-3))
+
+    def test_chunk_paths_for_budget(self):
+        """Test that chunks fit the budget and an impossible budget is rejected"""
+        distribution = ReturnDistribution('normal', 0.07, 0.15)
+        budget = 4 * 2 ** 30
+        chunk = chunk_paths_for_budget(budget, 30, distribution)
+        budget -= STREAMING_FIXED_BYTES + STREAMING_BYTES_PER_COMPRESSION * DEFAULT_COMPRESSION
+        self.assertLessEqual(chunk * (30 * 8 + STREAMING_BYTES_PER_PATH), budget)
+        self.assertGreater((chunk + 1) * (30 * 8 + STREAMING_BYTES_PER_PATH), budget)
+        fat_tailed = distribution._replace(kind='student_t', degrees_of_freedom=5)
+        self.assertLess(chunk_paths_for_budget(budget, 30, fat_tailed), chunk)
+        with self.assertRaises(ValueError):
+            simulate_streaming(1_000_000, 0.01, 30, paths=10, memory_budget=100)
+
+    def test_memory_budget_bounds_traced_peak(self):
+        """Test that the memory traced during a budgeted streaming run stays within the budget"""
+        budget = 2 ** 20
+        for distribution in (ReturnDistribution('normal', 0.07, 0.15), ReturnDistribution('student_t', 0.07, 0.15, 5)):
+            for compression in (100, DEFAULT_COMPRESSION):
+                with self.subTest(kind=distribution.kind, compression=compression):
+                    tracemalloc.start()
+                    try:
+                        simulate_streaming(1_000_000, 0.01, 30, distribution, paths=100_000, seed=3,
+                                           compression=compression, memory_budget=budget)
+                        _, peak = tracemalloc.get_traced_memory()
+                    finally:
+                        tracemalloc.stop()
+                    self.assertLessEqual(peak, budget)
+                    # The allowance is not so generous that the budget goes unused
+                    self.assertGreater(peak, budget * 0.7)
+
+    def test_peak_rss(self):
+        """Test that the peak resident set size is reported in bytes"""
+        own, _ = peak_rss()
+        self.assertGreater(own, 2 ** 20)
+
+    def test_variance_reduction(self):
+        """Test that antithetic and control variates shrink the error around the exact answer"""
+        distribution = ReturnDistribution('normal', 0.07, 0.15)
+        exact = InvestmentCalculator(1_000_000, 0.01, 30, 0.07).total_fees_paid()
+        plain = estimate_fee_cost(1_000_000, 0.01, 30, distribution, paths=20_000, seed=1,
+                                  antithetic=False, control_variate=False)
+        self.assertAlmostEqual(plain.variance_reduction, 1.0)
+        self.assertEqual(plain.standard_error, plain.plain_standard_error)
+        antithetic = estimate_fee_cost(1_000_000, 0.01, 30, distribution, paths=20_000, seed=1, control_variate=False)
+        reduced = estimate_fee_cost(1_000_000, 0.01, 30, distribution, paths=20_000, seed=1)
+        self.assertGreater(antithetic.variance_reduction, 1.5)
+        self.assertGreater(reduced.variance_reduction, 100 * antithetic.variance_reduction)
+        low, high = reduced.confidence_interval
+        self.assertLess(low, exact)
+        self.assertGreater(high, exact)
+        self.assertEqual(reduced.paths, 20_000)
+
+    def test_control_variate_unbiased_with_floor(self):
+        """Test that fat tails hitting the zero floor do not bias the control variate"""
+        distribution = ReturnDistribution('student_t', 0.07, 0.3, 3)
+        plain = estimate_fee_cost(1_000_000, 0.01, 20, distribution, paths=200_000, seed=2,
+                                  antithetic=False, control_variate=False)
+        reduced = estimate_fee_cost(1_000_000, 0.01, 20, distribution, paths=200_000, seed=3)
+        self.assertLess(abs(reduced.mean - plain.mean), 4 * math.hypot(plain.standard_error, reduced.standard_error))
+
+    def test_mirror_growth_reflects_draws(self):
+        """Test that antithetic pairs average to the mean return or its log-space centre"""
+        for kind in DISTRIBUTIONS:
+            distribution = ReturnDistribution(kind, 0.06, 0.2, 5)
+            growth = draw_growth(np.random.default_rng(0), distribution, np.empty(100_000))
+            mirrored = mirror_growth(distribution, growth)
+            self.assertAlmostEqual(np.concatenate([growth, mirrored]).mean() - 1, 0.06, delta=0.002, msg=kind)
+            if kind == 'lognormal':
+                np.testing.assert_allclose(np.log(growth) + np.log(mirrored), np.log(growth[0] * mirrored[0]))
+            else:
+                np.testing.assert_allclose(growth + mirrored, 2.12)
+
+    def test_compare_fees_uses_common_paths(self):
+        """Test that each fee level sees the paths simulate() draws for it alone"""
+        distribution = ReturnDistribution('lognormal', 0.07, 0.15)
+        comparison = compare_fees(1_000_000, [0.0025, 0.01], 20, distribution, paths=5000, seed=4, block_paths=1024)
+        for index, fee in enumerate(comparison.fee_percentages):
+            alone = simulate(1_000_000, fee, 20, distribution, paths=5000, seed=4, block_paths=1024)
+            self.assertTrue(math.isclose(comparison.mean_wealth_with_fees[index], alone.mean_wealth_with_fees,
+                                         rel_tol=1e-12))
+            self.assertTrue(math.isclose(comparison.mean_fee_cost[index], alone.mean_fee_cost, rel_tol=1e-12))
+        self.assertEqual(comparison.mean_difference[0], 0)
+        self.assertTrue(math.isclose(
+            comparison.mean_difference[1], comparison.mean_wealth_with_fees[0] - comparison.mean_wealth_with_fees[1],
+            rel_tol=1e-9,
+        ))
+
+    def test_common_paths_shrink_difference_error(self):
+        """Test that the fee difference is far more precise than with separate simulations"""
+        comparison = compare_fees(1_000_000, [0.0025, 0.005, 0.01], 30, paths=20_000, seed=5)
+        for common, separate in zip(comparison.standard_error_difference[1:],
+                                    comparison.independent_standard_error_difference[1:]):
+            self.assertLess(common * 5, separate)
+        # Without randomness the difference is the deterministic one
+        fixed = compare_fees(1_000_000, [0.0025, 0.01], 30, ReturnDistribution('normal', 0.07, 0.0), paths=10)
+        expected = (InvestmentCalculator(1_000_000, 0.0025, 30, 0.07).future_value_with_fees()
+                    - InvestmentCalculator(1_000_000, 0.01, 30, 0.07).future_value_with_fees())
+        self.assertTrue(math.isclose(fixed.mean_difference[1], expected, rel_tol=1e-10))
+
+    def test_compare_fees_independent_of_worker_count(self):
+        """Test that worker processes do not change the comparison"""
+        serial = compare_fees(1_000_000, [0.005, 0.01], 10, paths=1000, seed=6, block_paths=256)
+        parallel = compare_fees(1_000_000, [0.005, 0.01], 10, paths=1000, seed=6, workers=2, block_paths=256)
+        self.assertEqual(serial, parallel)
+
+    def test_block_seeds_are_stable(self):
+        """Test that a SeedSequence yields the same streams on every call"""
+        root = np.random.SeedSequence(5)
+        first = [seed.generate_state(1)[0] for seed in block_seeds(root, 3)]
+        second = [seed.generate_state(1)[0] for seed in block_seeds(root, 3)]
+        self.assertEqual(first, second)
+        self.assertEqual(len(set(first)), 3)
+
+    def test_distributions_have_requested_moments(self):
+        """Test that each distribution draws returns with the given mean and volatility"""
+        for kind in DISTRIBUTIONS:
+            distribution = ReturnDistribution(kind, 0.06, 0.2, 5)
+            growth = draw_growth(np.random.default_rng(3), distribution, np.empty(400_000))
+            self.assertAlmostEqual(growth.mean() - 1, 0.06, delta=0.003, msg=kind)
+            self.assertAlmostEqual(growth.std(), 0.2, delta=0.01, msg=kind)
+
+    def test_bands_are_ordered(self):
+        """Test that percentiles increase and fees always cost something"""
+        result = simulate(1_000_000, 0.01, 20, ReturnDistribution('lognormal', 0.07, 0.15), paths=5000, seed=2)
+        for band in (result.wealth_no_fees, result.wealth_with_fees, result.fee_cost):
+            values = [band[percentile] for percentile in result.percentiles]
+            self.assertEqual(values, sorted(values))
+        self.assertGreater(result.fee_cost[5], 0)
+
+    def test_balances_never_go_negative(self):
+        """Test that a year can lose at most the whole balance"""
+        no_fees, with_fees = simulate_paths(
+            1_000_000, 0.05, 10, ReturnDistribution('normal', 0.0, 1.0), 1000, seed=0
+        )
+        self.assertTrue(np.all(no_fees >= 0))
+        self.assertTrue(np.all(with_fees >= 0))
+        self.assertTrue(np.all(with_fees <= no_fees))
+
+    def test_zero_years(self):
+        """Test that no years leave every path at the initial value"""
+        result = simulate(1_000_000, 0.01, 0, paths=10, seed=0)
+        self.assertEqual(result.wealth_with_fees[95], 1_000_000)
+        self.assertEqual(result.mean_fee_cost, 0)
+
+    def test_invalid_parameters(self):
+        """Test that unusable distributions and sizes are rejected"""
+        with self.assertRaises(ValueError):
+            simulate(1_000_000, 0.01, 10, ReturnDistribution('uniform', 0.05, 0.1))
+        with self.assertRaises(ValueError):
+            simulate(1_000_000, 0.01, 10, ReturnDistribution('student_t', 0.05, 0.1, 2))
+        with self.assertRaises(ValueError):
+            simulate(1_000_000, 0.01, 10, paths=0)
+        with self.assertRaises(ValueError):
+            simulate(1_000_000, 0.01, 10, paths=10, transport='socket')
+
+
+if __name__ == '__main__':
+    unittest.main()
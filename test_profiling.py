@@ -0,0 +1,112 @@
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+import profiling
+import scoring
+import vectorized
+from calculator import InvestmentCalculator
+
+
+def run_profiled(args, profile_path):
+    """Run a Python command line with CALCULATOR_PROFILE set, failing on a non-zero exit"""
+    return subprocess.run(
+        [sys.executable, *args], check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=dict(os.environ, CALCULATOR_PROFILE=profile_path)
+    )
+
+
+class TestProfiling(unittest.TestCase):
+    """Unit tests for the opt-in profiling hooks"""
+
+    def setUp(self):
+        """Start each test with profiling off and no statistics"""
+        profiling.disable()
+        profiling.reset()
+
+    def tearDown(self):
+        """Leave profiling off"""
+        profiling.disable()
+        profiling.reset()
+
+    def test_disabled_by_default_leaves_functions_untouched(self):
+        """Test that nothing is wrapped or recorded while disabled"""
+        original = InvestmentCalculator.total_fees_paid
+        InvestmentCalculator(1_000_000, 0.01, 10, 0.05).total_fees_paid()
+        self.assertEqual(profiling.snapshot(), {})
+        self.assertIs(InvestmentCalculator.total_fees_paid, original)
+
+    def test_records_methods_and_batch_paths(self):
+        """Test that calls through methods and imported names are counted"""
+        original_batch = vectorized.evaluate_batch
+        profiling.enable()
+        calc = InvestmentCalculator(1_000_000, 0.01, 10, 0.05)
+        calc.total_fees_paid()
+        calc.opportunity_cost()
+        scoring.score_lines(['1000000,0.01,0.05,10\n'], [0, 1, 2, 3])
+        profiling.disable()
+
+        stats = profiling.snapshot()
+        self.assertEqual(stats['calculator.InvestmentCalculator.total_fees_paid'].calls, 1)
+        self.assertEqual(stats['calculator.InvestmentCalculator.compute'].calls, 2)
+        # scoring imported evaluate_batch by name, and that binding is instrumented too
+        self.assertEqual(stats['vectorized.evaluate_batch'].calls, 1)
+        self.assertEqual(stats['scoring.score_lines'].calls, 1)
+        self.assertGreaterEqual(stats['scoring.score_lines'].wall_seconds, stats['vectorized.evaluate_batch'].wall_seconds)
+        self.assertIs(vectorized.evaluate_batch, original_batch)
+        self.assertIs(scoring.evaluate_batch, original_batch)
+
+    def test_dumps(self):
+        """Test that JSON and pstats dumps can be read back"""
+        profiling.enable()
+        vectorized.evaluate_batch(np.ones(3), 0.01, 10, 0.05)
+        profiling.disable()
+        with tempfile.TemporaryDirectory() as work_dir:
+            json_path = os.path.join(work_dir, 'profile.json')
+            pstats_path = os.path.join(work_dir, 'profile.prof')
+            profiling.dump(json_path)
+            profiling.dump(pstats_path)
+            with open(json_path) as json_file:
+                self.assertEqual(json.load(json_file)['vectorized.evaluate_batch']['calls'], 1)
+            self.assertEqual(pstats.Stats(pstats_path).total_calls, 1)
+
+    def test_environment_hook_when_scoring_is_imported_first(self):
+        """Test that importing scoring before the other targets with profiling on does not fail"""
+        probe = ("import scoring; from calculator import InvestmentCalculator; "
+                 "InvestmentCalculator(1_000_000, 0.01, 10, 0.05).total_fees_paid(); "
+                 "scoring.score_lines(['1000000,0.01,0.05,10\\n'], [0, 1, 2, 3])")
+        with tempfile.TemporaryDirectory() as work_dir:
+            profile_path = os.path.join(work_dir, 'profile.json')
+            run_profiled(['-c', probe], profile_path)
+            with open(profile_path) as json_file:
+                stats = json.load(json_file)
+            self.assertEqual(stats['calculator.InvestmentCalculator.total_fees_paid']['calls'], 1)
+            self.assertEqual(stats['scoring.score_lines']['calls'], 1)
+
+    def test_environment_hook_dumps_from_pool_workers(self):
+        """Test that every worker of a parallel batch run writes its own dump"""
+        with tempfile.TemporaryDirectory() as work_dir:
+            input_path = os.path.join(work_dir, 'accounts.csv')
+            with open(input_path, 'w') as input_file:
+                input_file.write('initial_value,fee_percentage,annual_return,years\n')
+                input_file.writelines(f'{1000 + row},0.01,0.05,10\n' for row in range(1000))
+            run_profiled(['investments.py', 'batch', input_path, os.path.join(work_dir, 'scored.csv'),
+                          '--workers', '2', '--chunk-size', '100'], os.path.join(work_dir, 'profile-{pid}.json'))
+            dumps = []
+            for name in os.listdir(work_dir):
+                if name.startswith('profile-'):
+                    with open(os.path.join(work_dir, name)) as json_file:
+                        dumps.append(json.load(json_file))
+        # The parent and both workers, which between them score every chunk of 100 rows
+        self.assertEqual(len(dumps), 3)
+        self.assertGreaterEqual(sum(stats.get('scoring.score_lines', {}).get('calls', 0) for stats in dumps), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
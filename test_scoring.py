@@ -0,0 +1,165 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from calculator import InvestmentCalculator
+from scoring import RESULT_COLUMNS, score_csv, score_csv_parallel, stream_jsonl
+
+
+class TestScoreCsv(unittest.TestCase):
+    """Unit tests for chunked CSV scoring"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.rows = [
+            ('a1', 2_000_000, 0.01, 0.05, 15),
+            ('a2', 1_000_000, 0.01, 0.07, 30),
+            ('a3', 1_000_000, 0.01, -0.05, 5),
+            ('a4', 1_000_000, 0.01, 0.05, 0),
+            ('a5', 250_000, 0.0025, 0.06, 40),
+        ]
+        lines = ['account,years,annual_return,fee_percentage,initial_value\n']
+        lines += [f"{account},{years},{ret},{fee},{initial}\n" for account, initial, fee, ret, years in self.rows]
+        self.csv_text = ''.join(lines)
+
+    def score(self, chunk_size):
+        """Score the fixture CSV and return the summary and output lines"""
+        output = io.StringIO()
+        summary = score_csv(io.StringIO(self.csv_text), output, chunk_size=chunk_size)
+        return summary, output.getvalue().splitlines()
+
+    def test_results_match_calculator(self):
+        """Test that each output row carries the calculator's figures"""
+        summary, lines = self.score(chunk_size=2)
+        self.assertEqual(summary.rows, len(self.rows))
+        self.assertTrue(lines[0].endswith(','.join(RESULT_COLUMNS)))
+        for (account, initial, fee, ret, years), line in zip(self.rows, lines[1:]):
+            fields = line.split(',')
+            self.assertEqual(fields[0], account)
+            result = InvestmentCalculator(initial, fee, years, ret).compute()
+            self.assertEqual(fields[5:], [f"{value:.2f}" for value in result])
+
+    def test_chunk_size_does_not_change_output(self):
+        """Test that output is identical whatever the chunk size"""
+        _, single = self.score(chunk_size=1)
+        _, whole = self.score(chunk_size=1000)
+        self.assertEqual(single, whole)
+
+    def test_parallel_output_matches_serial(self):
+        """Test that sharded scoring preserves the input order and content"""
+        # Enough rows that every shard gets some, plus a blank line
+        text = self.csv_text + ''.join(self.csv_text.splitlines(keepends=True)[1:]) * 40 + '\n'
+        with tempfile.TemporaryDirectory() as work_dir:
+            input_path = os.path.join(work_dir, 'book.csv')
+            output_path = os.path.join(work_dir, 'scored.csv')
+            with open(input_path, 'w', newline='') as input_file:
+                input_file.write(text)
+            summary = score_csv_parallel(input_path, output_path, workers=2, chunk_size=7)
+            with open(output_path, newline='') as output_file:
+                parallel = output_file.read()
+        serial = io.StringIO()
+        score_csv(io.StringIO(text), serial)
+        self.assertEqual(summary.rows, len(self.rows) * 41)
+        self.assertEqual(parallel, serial.getvalue())
+
+    def test_quoted_columns(self):
+        """Test that quoted commas in extra columns and the header do not shift the input columns"""
+        text = ''.join(
+            f'"Smith, John",{line.rstrip()},"x"\n' if index else f'"client, name",{line.rstrip()},"note"\n'
+            for index, line in enumerate(self.csv_text.splitlines())
+        )
+        output = io.StringIO()
+        score_csv(io.StringIO(text), output)
+        _, expected = self.score(chunk_size=1000)
+        for line, plain in zip(output.getvalue().splitlines()[1:], expected[1:]):
+            self.assertTrue(line.startswith('"Smith, John",'))
+            self.assertEqual(line.split(',')[-4:], plain.split(',')[-4:])
+        with tempfile.TemporaryDirectory() as work_dir:
+            input_path = os.path.join(work_dir, 'book.csv')
+            output_path = os.path.join(work_dir, 'scored.csv')
+            with open(input_path, 'w', newline='') as input_file:
+                input_file.write(text)
+            score_csv_parallel(input_path, output_path, workers=2, chunk_size=2)
+            with open(output_path, newline='') as output_file:
+                self.assertEqual(output_file.read(), output.getvalue())
+
+    def test_missing_column(self):
+        """Test that a header without a required column is rejected"""
+        with self.assertRaises(ValueError):
+            score_csv(io.StringIO('initial_value,years\n1,2\n'), io.StringIO())
+
+
+class TestStreamJsonl(unittest.TestCase):
+    """Unit tests for JSON Lines streaming"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.records = [
+            {'id': index, 'initial_value': 1_000_000, 'fee_percentage': fee, 'annual_return': 0.07, 'years': years}
+            for index, (fee, years) in enumerate([(0.01, 30), (0.0025, 30), (0.01, 0), (0.02, 45), (0, 10)])
+        ]
+        self.input_text = ''.join(json.dumps(record) + '\n' for record in self.records)
+
+    def stream(self, batch_size):
+        """Stream the fixture records and return the decoded output objects"""
+        output = io.StringIO()
+        summary = stream_jsonl(io.StringIO(self.input_text), output, batch_size=batch_size)
+        self.assertEqual(summary.rows, len(self.records))
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_results_in_input_order(self):
+        """Test that output objects extend the inputs, in order"""
+        for batch_size in (1, 2, 100):
+            results = self.stream(batch_size)
+            self.assertEqual([result['id'] for result in results], [record['id'] for record in self.records])
+            for record, result in zip(self.records, results):
+                calc = InvestmentCalculator(
+                    record['initial_value'], record['fee_percentage'], record['years'], record['annual_return']
+                )
+                for column in RESULT_COLUMNS:
+                    self.assertAlmostEqual(result[column], getattr(calc, column)(), places=6)
+
+    def test_missing_field(self):
+        """Test that a record without a required field is rejected"""
+        with self.assertRaises(ValueError):
+            stream_jsonl(io.StringIO('{"initial_value": 1}\n'), io.StringIO())
+
+    def test_not_one_object_per_line(self):
+        """Test that a line holding two objects or a non-object is rejected, naming the line"""
+        record = json.dumps(self.records[0])
+        for bad_line in (f'{record},{record}', '[1,2]', '{'):
+            with self.subTest(bad_line=bad_line):
+                with self.assertRaisesRegex(ValueError, 'Line 1 '):
+                    stream_jsonl(io.StringIO(f'{bad_line}\n{record}\n'), io.StringIO())
+
+    def test_object_split_across_lines(self):
+        """Test that an object split over two lines is rejected even when the object count still matches"""
+        first, second, third = (json.dumps(dict(record, tags=[1, 2])) for record in self.records[:3])
+        split = first.replace('[1, 2]', '[1,\n2]')
+        with self.assertRaisesRegex(ValueError, 'Line 1 '):
+            stream_jsonl(io.StringIO(f'{split}\n{second},{third}\n'), io.StringIO())
+
+    def test_invalid_numbers(self):
+        """Test that non-finite fields, bad horizons and overflowing results are rejected, naming the line"""
+        good = json.dumps(self.records[0])
+        for field, value in (('years', None), ('initial_value', '1e400'), ('years', -1), ('years', 2.5),
+                             ('annual_return', 'NaN'), ('initial_value', '1e308')):
+            record = json.dumps(dict(self.records[0], **{field: value}))
+            if isinstance(value, str):
+                record = record.replace(f'"{value}"', value)
+            with self.subTest(field=field, value=value):
+                with self.assertRaisesRegex(ValueError, 'Line 2 '):
+                    stream_jsonl(io.StringIO(f'{good}\n{record}\n'), io.StringIO())
+
+    def test_input_text_is_kept(self):
+        """Test that the input fields are written back exactly as they were given"""
+        line = '{"initial_value": 1e6, "fee_percentage": 0.01, "annual_return": 0.07, "years": 30}'
+        output = io.StringIO()
+        stream_jsonl(io.StringIO(line + '\n'), output)
+        self.assertTrue(output.getvalue().startswith(line[:-1] + ','))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import unittest
+
+from cache import ResultCache
+from calculator import InvestmentCalculator
+from service import MAX_BODY_BYTES, CalculationService, MicroBatcher, SingleFlight, evaluate_scenarios
+
+
+async def post(port, path, payload):
+    """Send one POST request and return (status, decoded body)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for request coalescing"""
+
+    async def test_concurrent_submissions_share_one_evaluation(self):
+        """Test that scenarios submitted within the window are evaluated together"""
+        batches = []
+
+        def evaluate(scenarios):
+            batches.append(len(scenarios))
+            return evaluate_scenarios(scenarios)
+
+        batcher = MicroBatcher(evaluate, window=0.01)
+        scenarios = [(1_000_000, 0.01, 0.07, years) for years in range(1, 21)]
+        results = await asyncio.gather(*(batcher.submit(scenario) for scenario in scenarios))
+        self.assertEqual(batches, [20])
+        for years, result in zip(range(1, 21), results):
+            calc = InvestmentCalculator(1_000_000, 0.01, years, 0.07)
+            self.assertAlmostEqual(result['portfolioValueWithFees'], calc.future_value_with_fees(), places=6)
+            self.assertAlmostEqual(result['totalAdvisorCost'], calc.total_fees_paid(), places=6)
+
+    async def test_max_batch_flushes_early(self):
+        """Test that reaching max_batch evaluates without waiting for the window"""
+        batches = []
+
+        def evaluate(scenarios):
+            batches.append(len(scenarios))
+            return evaluate_scenarios(scenarios)
+
+        batcher = MicroBatcher(evaluate, window=10, max_batch=4)
+        await asyncio.gather(*(batcher.submit((1_000_000, 0.01, 0.07, 10)) for _ in range(8)))
+        self.assertEqual(batches, [4, 4])
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for in-flight deduplication"""
+
+    async def test_identical_requests_share_one_computation(self):
+        """Test that concurrent callers with one key run the computation once"""
+        single_flight = SingleFlight()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*(single_flight.run('key', compute) for _ in range(10)))
+        self.assertEqual(results, [42] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(single_flight.stats(), {'requests': 10, 'collapsed': 9, 'inFlight': 0})
+        # Once finished, the next call computes afresh
+        await single_flight.run('key', compute)
+        self.assertEqual(len(calls), 2)
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that cancelling one waiter leaves the shared computation running"""
+        single_flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            return 'done'
+
+        first = asyncio.ensure_future(single_flight.run('key', compute))
+        second = asyncio.ensure_future(single_flight.run('key', compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, 'done')
+
+
+class TestCalculationService(unittest.IsolatedAsyncioTestCase):
+    """End-to-end tests of the HTTP endpoints"""
+
+    async def asyncSetUp(self):
+        """Start the service on a free port"""
+        self.service = CalculationService(window=0.02)
+        self.server = await asyncio.start_server(self.service.handle_connection, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        """Stop the service"""
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def test_single_and_batch_agree(self):
+        """Test that both endpoints return the same InvestmentModel fields"""
+        scenario = {'initialValue': 1_000_000, 'feePercentage': 0.01, 'annualReturn': 0.07, 'years': 30}
+        status, single = await post(self.port, '/calculate', scenario)
+        self.assertEqual(status, 200)
+        status, batch = await post(self.port, '/calculate/batch', {'scenarios': [scenario, scenario]})
+        self.assertEqual(status, 200)
+        self.assertEqual(batch['results'], [single, single])
+        self.assertAlmostEqual(
+            single['futureValueNoFees'] - single['simpleFeesPaid'] - single['extraCompoundEffect'],
+            single['portfolioValueWithFees'],
+            places=4
+        )
+
+    async def test_identical_requests_collapsed(self):
+        """Test that concurrent identical requests are counted as collapsed"""
+        scenario = {'initialValue': 1_000_000, 'feePercentage': 0.01, 'annualReturn': 0.07, 'years': 30}
+        responses = await asyncio.gather(*(post(self.port, '/calculate', scenario) for _ in range(5)))
+        self.assertEqual(len({json.dumps(body) for _, body in responses}), 1)
+        stats = self.service.single_flight.stats()
+        self.assertEqual(stats['requests'], 5)
+        self.assertGreater(stats['collapsed'], 0)
+
+    async def test_result_cache(self):
+        """Test that a configured cache answers repeated scenarios"""
+        service = CalculationService(window=0.001, cache=ResultCache(8))
+        scenario = {'initialValue': 1_000_000, 'feePercentage': 0.01, 'annualReturn': 0.07, 'years': 30}
+        first = await service.calculate(scenario)
+        second = await service.calculate(scenario)
+        self.assertIs(first, second)
+        self.assertEqual((service.cache.hits, service.cache.misses), (1, 1))
+        self.assertIn('calculator_cache_hit_ratio 0.5', service.metrics.registry.render())
+
+    async def test_metrics_endpoint(self):
+        """Test that /metrics reports requests, latency and batch sizes"""
+        scenario = {'initialValue': 1_000_000, 'feePercentage': 0.01, 'annualReturn': 0.07, 'years': 30}
+        await post(self.port, '/calculate', scenario)
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nConnection: close\r\n\r\n")
+        response = (await reader.read()).decode()
+        writer.close()
+        self.assertIn('Content-Type: text/plain; version=0.0.4', response)
+        self.assertIn('calculator_requests_total{endpoint="/calculate",status="200"} 1', response)
+        self.assertIn('calculator_request_duration_seconds_count{endpoint="/calculate"} 1', response)
+        self.assertIn('calculator_batch_size_count{source="micro_batch"} 1', response)
+        self.assertIn('calculator_queue_depth 0', response)
+
+    async def test_errors(self):
+        """Test that bad requests are reported with client error statuses"""
+        status, body = await post(self.port, '/calculate', {'initialValue': 1})
+        self.assertEqual(status, 400)
+        self.assertIn('feePercentage', body['error'])
+        status, _ = await post(self.port, '/nowhere', {})
+        self.assertEqual(status, 404)
+        status, _ = await post(self.port, '/calculate/batch', [])
+        self.assertEqual(status, 400)
+
+    async def test_invalid_numbers(self):
+        """Test that non-finite inputs, bad horizons and overflowing results are client errors"""
+        scenario = {'initialValue': 1_000_000, 'feePercentage': 0.01, 'annualReturn': 0.07, 'years': 30}
+        for field, value in (('initialValue', float('nan')), ('annualReturn', float('inf')),
+                             ('years', -1), ('years', 2.5)):
+            with self.subTest(field=field, value=value):
+                status, body = await post(self.port, '/calculate', dict(scenario, **{field: value}))
+                self.assertEqual(status, 400)
+                self.assertIn('error', body)
+        status, body = await post(self.port, '/calculate/batch', {'scenarios': [
+            scenario, dict(scenario, initialValue=1e308, annualReturn=1.0, years=100)]})
+        self.assertEqual(status, 400)
+        self.assertIn('overflows', body['error'])
+
+    async def test_monte_carlo_requests_collapsed(self):
+        """Test that identical concurrent Monte Carlo requests share one simulation"""
+        request = {'initialValue': 1_000_000, 'feePercentage': 0.01, 'annualReturn': 0.07, 'years': 30,
+                   'volatility': 0.15, 'paths': 20_000, 'seed': 7}
+        responses = await asyncio.gather(*(post(self.port, '/montecarlo', request) for _ in range(4)))
+        self.assertEqual({status for status, _ in responses}, {200})
+        self.assertEqual(len({json.dumps(body) for _, body in responses}), 1)
+        body = responses[0][1]
+        self.assertEqual(body['paths'], 20_000)
+        self.assertLess(body['wealthWithFees']['50'], body['wealthNoFees']['50'])
+        self.assertGreater(body['meanFeeCost'], 0)
+        stats = self.service.single_flight.stats()
+        self.assertEqual(stats['requests'], 4)
+        self.assertEqual(stats['collapsed'], 3)
+        status, _ = await post(self.port, '/montecarlo', dict(request, seed=8))
+        self.assertEqual((status, self.service.single_flight.collapsed), (200, 3))
+
+    async def test_monte_carlo_errors(self):
+        """Test that invalid Monte Carlo parameters are client errors"""
+        request = {'initialValue': 1_000_000, 'feePercentage': 0.01, 'annualReturn': 0.07, 'years': 30}
+        for field, value in (('distribution', 'cauchy'), ('volatility', -0.1), ('paths', 1), ('paths', 10.5),
+                             ('seed', 'x'), ('distribution', 'student_t')):
+            with self.subTest(field=field, value=value):
+                status, body = await post(self.port, '/montecarlo', dict(request, **{field: value}))
+                self.assertEqual(status, 400)
+                self.assertIn('error', body)
+
+    async def test_handler_failure_is_reported(self):
+        """Test that an unexpected handler exception answers 500 instead of dropping the connection"""
+        async def broken(payload):
+            raise RuntimeError("boom")
+
+        self.service.routes['/calculate'] = ('POST', broken)
+        status, body = await post(self.port, '/calculate', {})
+        self.assertEqual(status, 500)
+        self.assertIn('error', body)
+
+    async def test_bad_content_length(self):
+        """Test that an oversized body is refused unread and a malformed length answers 400"""
+        for length, expected in ((MAX_BODY_BYTES + 1, 413), ('abc', 400), ('-1', 400)):
+            with self.subTest(length=length):
+                reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+                writer.write(f"POST /calculate HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+                await writer.drain()
+                response = await asyncio.wait_for(reader.read(), 5)
+                writer.close()
+                head, _, body = response.partition(b'\r\n\r\n')
+                self.assertEqual(int(head.split()[1]), expected)
+                self.assertIn(b'Connection: close', head)
+                self.assertIn('error', json.loads(body))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import math
+import warnings
+
+import numpy as np
+
+from calculator import InvestmentCalculator
+from vectorized import evaluate_batch, evaluate_horizons, fee_ledger, trajectory_matrix
+
+
+class TestEvaluateBatch(unittest.TestCase):
+    """Unit tests for the vectorized batch API"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.scenarios = [
+            (2_000_000, 0.01, 15, 0.05),
+            (1_000_000, 0.0001, 20, 0.05),
+            (1_000_000, 0.01, 5, -0.05),
+            (1_000_000, 0.01, 10, 0),
+            (1_000_000, 0.01, 0, 0.05),
+            (1_000_000, 0, 10, 0.05),
+            (1_000_000, 0.01, 30, 0.07),
+        ]
+
+    def test_matches_scalar_calculator(self):
+        """Test that every row matches InvestmentCalculator"""
+        columns = [np.array(column) for column in zip(*self.scenarios)]
+        result = evaluate_batch(*columns)
+        for row, params in enumerate(self.scenarios):
+            calc = InvestmentCalculator(*params)
+            for field in result._fields:
+                expected = getattr(calc, field)()
+                actual = getattr(result, field)[row]
+                self.assertTrue(
+                    math.isclose(actual, expected, rel_tol=1e-12, abs_tol=1e-6),
+                    f"{field}{params}: {actual} != {expected}"
+                )
+
+    def test_broadcasting(self):
+        """Test that scalars and arrays of different shapes broadcast"""
+        fees = np.array([0.0025, 0.01, 0.02])
+        years = np.array([[10], [20], [30], [40]])
+        result = evaluate_batch(1_000_000, fees, years, 0.07)
+        self.assertEqual(result.future_value_with_fees.shape, (4, 3))
+        expected = InvestmentCalculator(1_000_000, 0.02, 30, 0.07).total_fees_paid()
+        self.assertAlmostEqual(result.total_fees_paid[2, 2], expected, places=4)
+
+    def test_scalar_inputs(self):
+        """Test that all-scalar inputs yield zero-dimensional arrays"""
+        result = evaluate_batch(2_000_000, 0.01, 15, 0.05)
+        self.assertEqual(result.future_value_no_fees.shape, ())
+        np.testing.assert_array_equal(result.total_fees_paid, result.opportunity_cost)
+
+
+class TestHorizons(unittest.TestCase):
+    """Unit tests for the shared trajectory matrix"""
+
+    def test_trajectory_matrix_columns(self):
+        """Test that each column is the balance after that many years"""
+        no_fees, with_fees = trajectory_matrix([1_000_000, 2_000_000], 0.01, 0.05, 15)
+        self.assertEqual(no_fees.shape, (2, 16))
+        np.testing.assert_allclose(no_fees[:, 0], [1_000_000, 2_000_000])
+        expected = InvestmentCalculator(2_000_000, 0.01, 15, 0.05).future_value_with_fees()
+        self.assertAlmostEqual(with_fees[1, 15] / expected, 1, places=12)
+
+    def test_horizons_match_separate_calculators(self):
+        """Test that one matrix answers every horizon"""
+        horizons = [1, 5, 10, 20, 30]
+        result = evaluate_horizons(2_000_000, [0.005, 0.01], 0.05, horizons)
+        self.assertEqual(result.total_fees_paid.shape, (2, 5))
+        for row, fee in enumerate([0.005, 0.01]):
+            for column, years in enumerate(horizons):
+                expected = InvestmentCalculator(2_000_000, fee, years, 0.05).total_fees_paid()
+                self.assertAlmostEqual(result.total_fees_paid[row, column] / expected, 1, places=9)
+        # More years should result in higher total fees
+        self.assertTrue(np.all(np.diff(result.total_fees_paid, axis=1) > 0))
+
+    def test_memory_cap_chunks_identically(self):
+        """Test that chunked evaluation gives the same answer"""
+        fees = np.linspace(0, 0.02, 101)
+        full = evaluate_horizons(1_000_000, fees, 0.07, [0, 10, 40])
+        # Room for about three scenarios per chunk
+        chunked = evaluate_horizons(1_000_000, fees, 0.07, [0, 10, 40], max_bytes=3 * 2 * 41 * 8)
+        for field in full._fields:
+            np.testing.assert_array_equal(getattr(full, field), getattr(chunked, field))
+
+    def test_rejects_negative_horizons(self):
+        """Test that negative horizons are rejected"""
+        with self.assertRaises(ValueError):
+            evaluate_horizons(1_000_000, 0.01, 0.05, [5, -1])
+
+
+class TestFeeLedger(unittest.TestCase):
+    """Unit tests for the direct-fee / lost-growth breakdown"""
+
+    def test_matches_year_by_year_trajectory(self):
+        """Test that the closed form agrees with summing the trajectory"""
+        for params in [(1_000_000, 0.01, 30, 0.07), (1_000_000, 0.01, 5, -0.05), (500_000, 0.02, 20, 0.02)]:
+            path = InvestmentCalculator(*params).trajectory()
+            ledger = fee_ledger(*params)
+            expected_fees = sum(record.fee_charged for record in path)
+            self.assertAlmostEqual(float(ledger.simple_fees_paid) / expected_fees, 1, places=10)
+            self.assertAlmostEqual(float(ledger.compound_loss), path[-1].cumulative_lost_growth, places=3)
+
+    def test_breakdown_adds_up(self):
+        """Test that no-fee value less both components equals the with-fee value"""
+        ledger = fee_ledger([1_000_000, 2_000_000], [0.0025, 0.01], [30, 15], [0.07, 0.05])
+        np.testing.assert_allclose(
+            ledger.future_value_no_fees - ledger.simple_fees_paid - ledger.extra_compound_effect,
+            ledger.portfolio_value_with_fees
+        )
+        np.testing.assert_allclose(ledger.total_advisor_cost, ledger.simple_fees_paid + ledger.compound_loss)
+
+    def test_zero_net_return(self):
+        """Test the limit where the return exactly covers the fee"""
+        ledger = fee_ledger(1_000_000, 0.05, 10, 0.05)
+        self.assertAlmostEqual(float(ledger.simple_fees_paid), 500_000, places=6)
+        self.assertAlmostEqual(float(ledger.portfolio_value_with_fees), 1_000_000, places=6)
+
+    def test_total_loss_mixed_with_zero_net_return(self):
+        """Test that a return of -100% or worse next to a zero net return raises no warning"""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            ledger = fee_ledger([1e6, 1e6], [0.01, 0.01], [10, 10], [-1.5, 0.01])
+        self.assertAlmostEqual(float(ledger.simple_fees_paid[1]), 100_000, places=6)
+        for column in ledger:
+            self.assertTrue(np.all(np.isfinite(column)))
+
+
+if __name__ == '__main__':
+    unittest.main()
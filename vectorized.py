@@ -0,0 +1,150 @@
+"""Vectorized (NumPy) counterparts of InvestmentCalculator for large batches"""
+from collections import namedtuple
+
+import numpy as np
+
+
+BatchResult = namedtuple(
+    'BatchResult',
+    ['future_value_no_fees', 'future_value_with_fees', 'total_fees_paid', 'opportunity_cost']
+)
+
+FeeLedger = namedtuple(
+    'FeeLedger',
+    [
+        'future_value_no_fees', 'portfolio_value_with_fees', 'simple_fees_paid',
+        'compound_loss', 'extra_compound_effect', 'total_advisor_cost',
+    ]
+)
+
+
+def growth_factor(rate, years):
+    """Element-wise (1 + rate) ** years, using log1p so tiny rates stay accurate"""
+    undefined = rate <= -1
+    # np.where evaluates the fallback everywhere, so it needs the same guard
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = np.exp(years * np.log1p(rate))
+        if np.any(undefined):
+            factor = np.where(undefined, np.power(1 + rate, years), factor)
+    return factor
+
+
+def growth_gap(annual_return, fee_percentage, years):
+    """Element-wise (1 + r) ** n - (1 + r - f) ** n without cancellation for small fees"""
+    net_return = annual_return - fee_percentage
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_with_fees = np.log1p(net_return)
+        log_spread = np.log1p(fee_percentage / (1 + net_return))
+        gap = np.exp(years * log_with_fees) * np.expm1(years * log_spread)
+        undefined = (annual_return <= -1) | (net_return <= -1)
+        if np.any(undefined):
+            fallback = growth_factor(annual_return, years) - growth_factor(net_return, years)
+            gap = np.where(undefined, fallback, gap)
+    return gap
+
+
+def _as_arrays(*values):
+    """Convert the inputs to broadcast float64 arrays"""
+    return np.broadcast_arrays(*(np.asarray(value, dtype=np.float64) for value in values))
+
+
+def evaluate_batch(initial_value, fee_percentage, years, annual_return):
+    """Evaluate many scenarios at once
+
+    Every parameter may be a scalar or an array; they are broadcast against
+    each other and the four figures are returned as arrays of the broadcast
+    shape, matching the closed-form engine of InvestmentCalculator.
+    """
+    initial_value, fee_percentage, years, annual_return = _as_arrays(
+        initial_value, fee_percentage, years, annual_return
+    )
+    no_fees = initial_value * growth_factor(annual_return, years)
+    with_fees = initial_value * growth_factor(annual_return - fee_percentage, years)
+    fees = initial_value * growth_gap(annual_return, fee_percentage, years)
+    return BatchResult(no_fees, with_fees, fees, fees.copy())
+
+
+def trajectory_matrix(initial_value, fee_percentage, annual_return, max_years):
+    """Return scenarios x (max_years + 1) balance matrices without and with fees
+
+    Column k holds each scenario's balance after k years, built with one
+    cumulative product along the year axis.
+    """
+    initial_value, fee_percentage, annual_return = (
+        np.atleast_1d(array) for array in _as_arrays(initial_value, fee_percentage, annual_return)
+    )
+    shape = (initial_value.shape[0], max_years + 1)
+    no_fees = np.empty(shape)
+    with_fees = np.empty(shape)
+    no_fees[:, 0] = initial_value
+    with_fees[:, 0] = initial_value
+    no_fees[:, 1:] = (1 + annual_return)[:, np.newaxis]
+    with_fees[:, 1:] = (1 + annual_return - fee_percentage)[:, np.newaxis]
+    np.cumprod(no_fees, axis=1, out=no_fees)
+    np.cumprod(with_fees, axis=1, out=with_fees)
+    return no_fees, with_fees
+
+
+def evaluate_horizons(initial_value, fee_percentage, annual_return, horizons, max_bytes=None):
+    """Evaluate one set of scenarios at several horizons from shared cumulative products
+
+    The parameters are broadcast to a 1-D array of scenarios and every field
+    of the returned BatchResult has shape (scenarios, len(horizons)). When
+    max_bytes is given, scenarios are processed in chunks so the trajectory
+    matrices never exceed that many bytes.
+    """
+    initial_value, fee_percentage, annual_return = (
+        np.atleast_1d(array).ravel() for array in _as_arrays(initial_value, fee_percentage, annual_return)
+    )
+    horizons = np.asarray(horizons, dtype=np.intp)
+    if horizons.ndim != 1 or np.any(horizons < 0):
+        raise ValueError("horizons must be a 1-D sequence of non-negative whole years")
+    max_years = int(horizons.max()) if horizons.size else 0
+    count = initial_value.shape[0]
+    # Two float64 matrices of max_years + 1 columns per scenario
+    row_bytes = 2 * (max_years + 1) * np.dtype(np.float64).itemsize
+    chunk = count if max_bytes is None else max(1, min(count, max_bytes // row_bytes))
+
+    no_fees = np.empty((count, horizons.size))
+    with_fees = np.empty((count, horizons.size))
+    for start in range(0, count, chunk):
+        rows = slice(start, start + chunk)
+        balances_no_fees, balances_with_fees = trajectory_matrix(
+            initial_value[rows], fee_percentage[rows], annual_return[rows], max_years
+        )
+        no_fees[rows] = balances_no_fees[:, horizons]
+        with_fees[rows] = balances_with_fees[:, horizons]
+    fees = no_fees - with_fees
+    return BatchResult(no_fees, with_fees, fees, fees.copy())
+
+
+def _geometric_sum(rate, years):
+    """Element-wise sum of (1 + rate) ** k for k in [0, years), accurate near rate == 0"""
+    undefined = rate <= -1
+    # np.where evaluates the fallback everywhere, including rate == 0, so it needs the same guard
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = np.expm1(years * np.log1p(rate)) / rate
+        if np.any(undefined):
+            total = np.where(undefined, (np.power(1 + rate, years) - 1) / rate, total)
+    return np.where(rate == 0, years, total)
+
+
+def fee_ledger(initial_value, fee_percentage, years, annual_return):
+    """Split the cost of fees into direct fees paid and compounded lost growth
+
+    Mirrors the web page's InvestmentModel breakdown: simple_fees_paid is the
+    sum of the fees charged each year on the start-of-year balance,
+    compound_loss (also reported as extra_compound_effect) is the growth those
+    fees would have earned, and total_advisor_cost is their sum, equal to the
+    gap between the two future values. Everything is closed form.
+    """
+    initial_value, fee_percentage, years, annual_return = _as_arrays(
+        initial_value, fee_percentage, years, annual_return
+    )
+    net_return = annual_return - fee_percentage
+    no_fees = initial_value * growth_factor(annual_return, years)
+    with_fees = initial_value * growth_factor(net_return, years)
+    total_cost = initial_value * growth_gap(annual_return, fee_percentage, years)
+    simple_fees = initial_value * fee_percentage * _geometric_sum(net_return, years)
+    lost_growth = total_cost - simple_fees
+    return FeeLedger(no_fees, with_fees, simple_fees, lost_growth, lost_growth.copy(), total_cost)